@@ -0,0 +1,75 @@
+// Clientside version of update_map_and_scoreboard, enabled with CLIENTSIDE_ELECTION_NIGHT=1.
+// The map is a single choropleth trace whose z values are the rating codes of electoralTally.py,
+// so a click only rewrites the z entry of the clicked state and moves its votes between totals.
+var TOSSUP = 3;
+var VOTES_TO_WIN = 270;
+
+function ratingSide(code) {
+    return code < TOSSUP ? 'DEM' : (code === TOSSUP ? 'Tossup' : 'REP');
+}
+
+// Same text as path_to_270_text in dashboard.py
+function pathTo270Text(ratings, totals, voteStore) {
+    var tossups = Object.keys(ratings).filter(function (state) {
+        return ratings[state] === TOSSUP;
+    }).sort(function (a, b) {
+        return (voteStore[b] - voteStore[a]) || (a < b ? -1 : (a > b ? 1 : 0));
+    });
+
+    var parts = ['DEM', 'REP'].map(function (party) {
+        var needed = Math.max(0, VOTES_TO_WIN - totals[party]);
+        if (needed === 0) {
+            return party + ' has ' + VOTES_TO_WIN;
+        }
+        var path = [];
+        var gained = 0;
+        for (var i = 0; i < tossups.length && gained < needed; i++) {
+            path.push(tossups[i]);
+            gained += voteStore[tossups[i]];
+        }
+        if (gained < needed) {
+            return party + ' needs ' + needed + ': no path through the tossups';
+        }
+        return party + ' needs ' + needed + ': ' + path.join(', ');
+    });
+    parts.push('Tossups: ' + (tossups.map(function (state) {
+        return state + ' (' + voteStore[state] + ')';
+    }).join(', ') || 'none'));
+    return parts.join(' | ');
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    electionNight: {
+        cycleState: function (clickData, figure, ratingStore, voteStore) {
+            var noUpdate = window.dash_clientside.no_update;
+            var mapFigure = noUpdate;
+            var store = noUpdate;
+            var ratings = ratingStore.ratings;
+            var totals = ratingStore.totals;
+
+            if (clickData) {
+                var stateClicked = clickData.points[0].location;
+                var code = ratings[stateClicked];
+
+                // Same cycle as the server: DEM -> Tossup -> REP -> DEM Lean
+                var nextCode = code < TOSSUP ? TOSSUP : (code === TOSSUP ? TOSSUP + 1 : TOSSUP - 1);
+
+                ratings = Object.assign({}, ratings);
+                ratings[stateClicked] = nextCode;
+                totals = Object.assign({}, totals);
+                totals[ratingSide(code)] -= voteStore[stateClicked];
+                totals[ratingSide(nextCode)] += voteStore[stateClicked];
+                store = {ratings: ratings, totals: totals};
+
+                var trace = figure.data[0];
+                var z = trace.z.slice();
+                z[trace.locations.indexOf(stateClicked)] = nextCode;
+                mapFigure = Object.assign({}, figure, {
+                    data: [Object.assign({}, trace, {z: z})].concat(figure.data.slice(1))
+                });
+            }
+
+            return [mapFigure, totals.DEM, totals.REP, pathTo270Text(ratings, totals, voteStore), store];
+        }
+    }
+});
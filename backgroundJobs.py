@@ -0,0 +1,227 @@
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock, local
+
+# Background jobs for work too slow to run inside a request, without a broker: a SQLite
+# table is the queue, shared by every web worker process on the host, and each web worker
+# runs the jobs it claims in its own process pool, so its threads keep serving requests.
+# A job is a module-level function named 'module:function', called as function(progress, **args)
+# with JSON arguments; it returns a JSON result and may report progress(fraction) as it goes.
+# The job id hashes the function and its arguments: submitting the same work again returns
+# the job already queued, running or done, whichever worker took it.
+
+progress_interval = 0.25  # Seconds between two progress writes of a job
+
+# Pool processes start from a clean interpreter: forking a threaded web worker could copy a held lock
+pool_context = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+
+def job_id_for(kind, args):
+    key = json.dumps([kind, args], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def run_job(path, job_id, kind, args):
+    # Runs in a pool process, every update goes straight to the queue
+    conn = connect(path)
+    last_write = 0.0
+
+    def progress(fraction):
+        nonlocal last_write
+        now = time.time()
+        if now - last_write >= progress_interval:
+            last_write = now
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET progress = ?, updated = ? WHERE job_id = ?",
+                    (min(max(float(fraction), 0.0), 1.0), now, job_id)
+                )
+
+    try:
+        module, name = kind.split(':')
+        result = getattr(importlib.import_module(module), name)(progress, **args)
+        payload = zlib.compress(json.dumps(result, separators=(',', ':')).encode('utf-8'))
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', progress = 1, result = ?, updated = ? WHERE job_id = ?",
+                (payload, time.time(), job_id)
+            )
+    except Exception as error:
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE job_id = ?",
+                (f"{type(error).__name__}: {error}", time.time(), job_id)
+            )
+    finally:
+        conn.close()
+
+
+class JobQueue:
+
+    def __init__(self, path, workers=1, max_jobs=1000, max_queued=100, stale_after=600):
+        self.path = path
+        self.workers = workers
+        self.max_jobs = max_jobs  # Finished jobs kept, with their results
+        self.max_queued = max_queued  # Jobs waiting for a pool process, submit refuses more
+        self.stale_after = stale_after  # A running job silent for longer lost its worker, run it again
+        self._local = local()
+        self._lock = Lock()
+        self._executor = None
+        self._pid = None
+        self._running = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, kind TEXT, args TEXT, status TEXT, "
+                "progress REAL, result BLOB, error TEXT, created REAL, updated REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def _connection(self):
+        # One connection per thread and per process, workers may be forked
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = connect(self.path)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def submit(self, kind, args):
+        # Job id, or None when max_queued jobs are already waiting and this one is not among them
+        job_id = job_id_for(kind, args)
+        now = time.time()
+        queued = "(SELECT COUNT(*) FROM jobs WHERE status = 'queued') < ?"
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT OR IGNORE INTO jobs SELECT ?, ?, ?, 'queued', 0, NULL, NULL, ?, ? WHERE {queued}",
+                (job_id, kind, json.dumps(args, sort_keys=True), now, now, self.max_queued)
+            )
+            # A failed job is tried again when submitted again
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', progress = 0, error = NULL, created = ?, updated = ? "
+                f"WHERE job_id = ? AND status = 'failed' AND {queued}",
+                (now, now, job_id, self.max_queued)
+            )
+        status = self.status(job_id)
+        if status is None or status['status'] == 'failed':
+            return None
+        self.dispatch()
+        return job_id
+
+    def claim(self):
+        # Oldest queued (or abandoned) job, None when there is nothing to run.
+        # Another worker may claim the same row first, the UPDATE only succeeds once.
+        conn = self._connection()
+        while True:
+            stale = time.time() - self.stale_after
+            row = conn.execute(
+                "SELECT job_id, kind, args FROM jobs WHERE status = 'queued' OR (status = 'running' AND updated < ?) "
+                "ORDER BY created LIMIT 1",
+                (stale,)
+            ).fetchone()
+            if row is None:
+                return None
+            with conn:
+                claimed = conn.execute(
+                    "UPDATE jobs SET status = 'running', updated = ? "
+                    "WHERE job_id = ? AND (status = 'queued' OR (status = 'running' AND updated < ?))",
+                    (time.time(), row[0], stale)
+                ).rowcount
+            if claimed:
+                return row[0], row[1], json.loads(row[2])
+
+    def dispatch(self):
+        # Fill this process's pool with queued jobs, called on submit, on every poll and as jobs finish
+        submitted = []
+        with self._lock:
+            # Pools do not survive a fork: start one per web worker process, on first use
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=pool_context)
+                self._running = 0
+            while self._running < self.workers:
+                job = self.claim()
+                if job is None:
+                    break
+                job_id, kind, args = job
+                executor = self._executor
+                try:
+                    future = executor.submit(run_job, self.path, job_id, kind, args)
+                except (BrokenProcessPool, RuntimeError) as error:
+                    # The pool lost a process before this job reached it: the next dispatch starts a new pool
+                    self.fail(job_id, error)
+                    executor.shutdown(wait=False)
+                    self._pid = None
+                    break
+                self._running += 1
+                submitted.append((job_id, executor, future))
+        # Outside the lock: the callback of a future already finished runs right here
+        for job_id, executor, future in submitted:
+            future.add_done_callback(
+                lambda future, job_id=job_id, executor=executor: self._finished(job_id, executor, future)
+            )
+
+    def _finished(self, job_id, executor, future):
+        with self._lock:
+            # Jobs of a pool already replaced are not counted anymore
+            if executor is self._executor:
+                self._running -= 1
+                if future.exception() is not None:
+                    # A pool process died (run_job records the job's own errors), the next dispatch starts a new pool
+                    executor.shutdown(wait=False)
+                    self._pid = None
+        if future.exception() is not None:
+            self.fail(job_id, future.exception())
+        self.prune()
+        self.dispatch()
+
+    def fail(self, job_id, error):
+        # Record a job lost with its pool process, run_job records the errors of the job itself
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE job_id = ? AND status = 'running'",
+                (f"{type(error).__name__}: {error}", time.time(), job_id)
+            )
+
+    def prune(self):
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND job_id NOT IN "
+                "(SELECT job_id FROM jobs WHERE status IN ('done', 'failed') ORDER BY updated DESC LIMIT ?)",
+                (self.max_jobs,)
+            )
+
+    def status(self, job_id):
+        row = self._connection().execute(
+            "SELECT status, progress, error FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'status': row[0], 'progress': row[1], 'error': row[2]}
+
+    def result(self, job_id):
+        row = self._connection().execute(
+            "SELECT result FROM jobs WHERE job_id = ? AND status = 'done'", (job_id,)
+        ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def stats(self):
+        counts = dict(self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        with self._lock:
+            running_here = self._running
+        return {'path': self.path, 'workers': self.workers, 'running_here': running_here, 'jobs': counts}
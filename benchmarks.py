@@ -0,0 +1,213 @@
+import argparse
+import gzip
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from itertools import product
+
+import dashboard
+import usElections
+from figureCache import serialize_outputs
+
+# Benchmark every Dash callback over its full input sweep:
+#   python benchmarks.py                 compare against the saved baseline
+#   python benchmarks.py --save          record a new baseline
+#   python benchmarks.py --only results  run the cases whose name starts with "results"
+# Exits with status 1 when a case got slower than the baseline by more than --threshold.
+
+default_baseline_path = os.path.join(usElections.current_directory, 'benchmark_baseline.json')
+
+
+def build_cases():
+    years = sorted(dashboard.data['results_cube'])
+    selectors = ('REP', 'DEM', 'MARGIN')
+    color_modes = (0, 1)
+    states = list(dashboard.data['election_night_index'])
+    initial_tally = dashboard.data['initial_tally']
+    electoral_votes = dashboard.data['electoral_votes']
+
+    results_args = lambda: list(product(years, color_modes))
+    evolution_args = lambda: list(product(years, years, selectors, color_modes))
+    # One click on every state, starting from the initial ratings
+    rating_store = lambda: json.loads(json.dumps(initial_tally.to_store()))
+    election_night_args = lambda: [(None, rating_store(), electoral_votes)] + [
+        ({'points': [{'location': state}]}, rating_store(), electoral_votes) for state in states
+    ]
+    state_counts = [dashboard.data['results_cube'][year] for year in years]
+    winner_args = lambda: [(str(counts['dem_count']), str(counts['rep_count'])) for counts in state_counts]
+    vote_args = lambda: [(str(dem), str(rep)) for dem, rep in product(range(0, 539, 11), repeat=2)]
+    swing_args = lambda: list(product(years, ('uniform', 'proportional'), (-5.0, 0.0, 2.5)))
+    simulation_args = lambda: [
+        (1, rating_store(), None, draws, correlation) for draws, correlation in product((10000, 100000), (0.0, 0.5, 0.9))
+    ]
+
+    # name: (callback, argument sweep, cache mode); "cold" clears the output caches and
+    # skips the prerendered store, "cached" measures a second pass over a warm cache
+    cases = {
+        'results': (dashboard.update_results_map, results_args, 'cold'),
+        'results_cached': (dashboard.update_results_map, results_args, 'cached'),
+        'evolution': (dashboard.update_evolution_map, evolution_args, 'cold'),
+        'evolution_cached': (dashboard.update_evolution_map, evolution_args, 'cached'),
+        'election_night': (dashboard.update_map_and_scoreboard, election_night_args, None),
+        'winner': (dashboard.update_winner_logo_and_text, winner_args, None),
+        'winner_2': (dashboard.update_winner_logo_and_text_2, vote_args, None),
+        'swing': (dashboard.update_swing_map, swing_args, 'cold'),
+        'simulation': (dashboard.update_simulation, simulation_args, 'cold'),
+        # Every state at once, then one state at a time
+        'trends': (dashboard.render_trends, lambda: [('state', ())] + [('state', (state,)) for state in states], 'cold'),
+    }
+
+    # County maps, when COUNTY_RESULTS_PATH and COUNTY_GEOJSON_PATH are set
+    if 'county_cube' in dashboard.data:
+        county_years = sorted(dashboard.data['county_cube'])
+        cases['county_results'] = (
+            dashboard.update_results_map, lambda: [args + ('county',) for args in product(county_years, color_modes)], 'cold'
+        )
+        cases['county_evolution'] = (
+            dashboard.update_evolution_map,
+            lambda: [(start, end, 'MARGIN', 0, 'county') for start, end in zip(county_years[:-1], county_years[1:])],
+            'cold'
+        )
+        cases['county_trends'] = (dashboard.render_trends, lambda: [('county', ())], 'cold')
+    return cases
+
+
+def reset_caches():
+    for cache in dashboard.figure_caches.values():
+        cache.clear()
+    dashboard.data['trends'] = {}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run_case(func, make_args, cache_mode, repeat, alloc_samples):
+    stores = [(cache, cache.store) for cache in (dashboard.results_cache, dashboard.evolution_cache)]
+    for cache, _ in stores:
+        cache.store = None
+
+    try:
+        timings = []
+        payloads = []
+        compressed = []
+        for i in range(repeat):
+            args_list = make_args()
+            if cache_mode == 'cold':
+                reset_caches()
+            elif cache_mode == 'cached':
+                reset_caches()
+                for args in args_list:
+                    func(*args)
+                args_list = make_args()
+
+            for args in args_list:
+                start = time.perf_counter()
+                outputs = func(*args)
+                timings.append(time.perf_counter() - start)
+                if i == 0:
+                    payload = serialize_outputs(outputs)
+                    payloads.append(len(payload))
+                    # What a browser receives, see httpCaching.py
+                    compressed.append(len(gzip.compress(payload, 6)))
+
+        # Peak traced memory per call, on an evenly spaced sample of the sweep
+        args_list = make_args()
+        step = max(1, len(args_list) // alloc_samples)
+        peaks = []
+        if cache_mode == 'cold':
+            reset_caches()
+        tracemalloc.start()
+        try:
+            for args in args_list[::step]:
+                tracemalloc.reset_peak()
+                base, _ = tracemalloc.get_traced_memory()
+                func(*args)
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - base)
+        finally:
+            tracemalloc.stop()
+    finally:
+        for cache, store in stores:
+            cache.store = store
+
+    return {
+        'calls': len(timings),
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 4),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 4),
+        'peak_alloc_kib': round(max(peaks) / 1024, 1),
+        'mean_alloc_kib': round(sum(peaks) / len(peaks) / 1024, 1),
+        'payload_bytes': round(sum(payloads) / len(payloads)),
+        'gzip_bytes': round(sum(compressed) / len(compressed)),
+    }
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    regressions = []
+    print(f"{'case':<18}{'p50 ms':>10}{'p99 ms':>10}{'alloc KiB':>11}{'bytes':>9}{'gzip':>8}   vs baseline")
+    for name, result in results.items():
+        line = (f"{name:<18}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+                f"{result['peak_alloc_kib']:>11.1f}{result['payload_bytes']:>9}{result['gzip_bytes']:>8}")
+        previous = baseline.get(name)
+        if previous:
+            changes = []
+            for metric in ('p50_ms', 'p99_ms', 'payload_bytes'):
+                if previous.get(metric):
+                    change = result[metric] / previous[metric] - 1
+                    changes.append(f"{metric} {change:+.0%}")
+                    # Timings of sub-millisecond callbacks are mostly noise, also require an absolute slowdown
+                    noise = metric.endswith('_ms') and result[metric] - previous[metric] < min_delta_ms
+                    if change > threshold and not noise:
+                        regressions.append(f"{name} {metric}: {previous[metric]} -> {result[metric]}")
+            line += '   ' + ', '.join(changes)
+        print(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard callbacks")
+    parser.add_argument('--baseline', default=default_baseline_path, help="baseline file to compare against or save")
+    parser.add_argument('--save', action='store_true', help="save this run as the new baseline")
+    parser.add_argument('--only', default='', help="only run cases whose name starts with this prefix")
+    parser.add_argument('--repeat', type=int, default=1, help="passes over each input sweep")
+    parser.add_argument('--alloc-samples', type=int, default=25, help="calls traced for allocations per case")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed slowdown before failing, 0.2 = 20%%")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    usElections.create_app()
+
+    results = {}
+    for name, (func, make_args, cache_mode) in build_cases().items():
+        if name.startswith(args.only):
+            results[name] = run_case(func, make_args, cache_mode, args.repeat, args.alloc_samples)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get('cases', {})
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'cases': {**baseline, **results},
+            }, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
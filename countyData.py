@@ -0,0 +1,141 @@
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from electionData import build_evolution_index, build_margin_engine, compact_results, rank_leaders
+
+# County-level presidential results, in the layout of the MIT Election Lab county file:
+#   year, state_po, county_name, county_fips, party, candidatevotes[, mode, ...]
+# About 3,100 counties per election, so every derived table is built with column
+# operations, and hover text is sent as compact customdata rendered by a hovertemplate.
+
+county_party_names = {'DEMOCRAT': 'DEM', 'REPUBLICAN': 'REP'}
+
+county_columns = ['year', 'state_po', 'county_name', 'county_fips', 'party', 'candidatevotes']
+
+# Hover of the county maps, customdata is [county, leader share, runner-up share, margin, leader]
+county_hovertemplate = (
+    '<b>%{customdata[0]}</b><br><br>'
+    '%{customdata[4]}: %{customdata[1]:.1%}<br>'
+    'Runner-up: %{customdata[2]:.1%}<br><br>'
+    '<b>+%{customdata[3]:.1f}% %{customdata[4]}</b><extra></extra>'
+)
+
+
+def read_county_results(csv_path):
+    df = pd.read_csv(csv_path, usecols=county_columns, dtype={'county_fips': str, 'county_name': str})
+    df = df.dropna(subset=['county_fips', 'party'])
+
+    # FIPS codes may have been written as floats ("1001.0")
+    df['county_fips'] = df['county_fips'].str.split('.').str[0].str.zfill(5)
+    df['party'] = df['party'].replace(county_party_names)
+    df['year'] = df['year'].astype(int)
+
+    # Sum the vote modes (election day, absentee, ...) of every party in a county
+    votes = df.groupby(['year', 'county_fips', 'party'], as_index=False, sort=False).agg(
+        state_po=('state_po', 'first'),
+        county_name=('county_name', 'first'),
+        candidatevotes=('candidatevotes', 'sum'),
+    )
+    votes['totalvotes'] = votes.groupby(['year', 'county_fips'])['candidatevotes'].transform('sum')
+    votes['pct'] = (votes['candidatevotes'] / votes['totalvotes']).where(votes['totalvotes'] > 0, 0.0)
+    votes['county'] = votes['county_name'].str.title() + ', ' + votes['state_po']
+
+    for column in ('county_fips', 'state_po', 'county_name', 'county', 'party'):
+        votes[column] = votes[column].astype('category')
+    return votes
+
+
+def build_county_cube(df):
+    # Winner, runner-up and margin of every county, one entry per election year; county maps
+    # format their hover boxes from customdata, so no hover text is built
+    leaders = rank_leaders(df, location='county_fips', name=None)
+
+    cube = {}
+    for year, year_df in leaders.groupby('year', observed=True):
+        year_df = year_df.reset_index(drop=True)
+
+        closest_races = year_df[['county', 'party', 'margin']].nsmallest(10, 'margin').reset_index(drop=True)
+        closest_races['n'] = closest_races.index + 1
+
+        furthest_races = year_df[['county', 'party', 'margin']].nlargest(10, 'margin').reset_index(drop=True)
+        furthest_races['n'] = furthest_races.index + 1
+
+        cube[int(year)] = {
+            'counties': year_df,
+            # Object array: plotly validates it in one step instead of element by element
+            'customdata': np.array(list(zip(
+                year_df['county'].astype(str), year_df['pct'].round(4), year_df['second_pct'].round(4),
+                year_df['margin'], year_df['party'].astype(str)
+            )), dtype=object),
+            'closest': closest_races.astype({'county': str, 'party': str}).to_dict('records'),
+            'furthest': furthest_races.astype({'county': str, 'party': str}).to_dict('records'),
+            'dem_count': int((year_df['party'] == 'DEM').sum()),
+            'rep_count': int((year_df['party'] == 'REP').sum()),
+            'other_count': int((~year_df['party'].isin(['DEM', 'REP'])).sum()),
+        }
+    return cube
+
+
+def simplify_geojson(geojson, precision=3):
+    # Round coordinates (3 decimals is about 100 m) and drop the points that collapse onto
+    # their predecessor, keeping only each feature's id and geometry
+    def simplify_ring(ring):
+        coords = np.round(np.asarray(ring, dtype=float)[:, :2], precision)
+        keep = np.ones(len(coords), dtype=bool)
+        keep[1:] = np.any(coords[1:] != coords[:-1], axis=1)
+        coords = coords[keep]
+        return coords.tolist() if len(coords) >= 4 else None
+
+    features = []
+    for feature in geojson['features']:
+        geometry = feature.get('geometry') or {}
+        polygons = geometry.get('coordinates', [])
+        if geometry.get('type') == 'Polygon':
+            polygons = [polygons]
+        elif geometry.get('type') != 'MultiPolygon':
+            continue
+
+        simplified = []
+        for polygon in polygons:
+            rings = [ring for ring in map(simplify_ring, polygon) if ring is not None]
+            if rings:
+                simplified.append(rings)
+        if not simplified:
+            continue
+
+        feature_id = feature.get('id') or feature.get('properties', {}).get('GEOID')
+        features.append({
+            'type': 'Feature',
+            'id': str(feature_id).zfill(5),
+            'geometry': {'type': 'MultiPolygon', 'coordinates': simplified},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def load_county_geojson(path):
+    # Simplified county shapes as served by /geo/counties.geojson: bytes plus an ETag
+    with open(path) as f:
+        geojson = simplify_geojson(json.load(f))
+    payload = json.dumps(geojson, separators=(',', ':')).encode('utf-8')
+    return {
+        'payload': payload,
+        'etag': hashlib.sha256(payload).hexdigest()[:32],
+    }
+
+
+def load_county_data(csv_path, geojson_path):
+    # Same compact, year-sorted layout as the state results
+    county_df = compact_results(read_county_results(csv_path))
+    county_engine = build_margin_engine(county_df, location='county_fips', name=None)
+    return {
+        'county_df': county_df,
+        'county_cube': build_county_cube(county_df),
+        # County x year x party matrix used by the Evolution tab
+        'county_engine': county_engine,
+        'county_evolution_index': build_evolution_index(county_engine),
+        'county_names': dict(zip(county_df['county_fips'].astype(str), county_df['county'].astype(str))),
+        'county_geojson': load_county_geojson(geojson_path),
+    }
@@ -0,0 +1,1568 @@
+import os
+import sys
+from threading import Lock
+
+import dash
+import flask
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from dash import Patch, callback, ctx, dcc, html, dash_table
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import MissingCallbackContextException
+from electionData import (
+    apply_live_results, data_fingerprint, evolution_frame, evolution_rankings, hover_text, margin_bucket_colors, percent_text
+)
+from electionSimulator import simulate_election
+from electoralTally import ElectoralTally, next_rating, rating_codes, rating_labels, votes_to_win
+from countyData import county_hovertemplate
+from figureCache import ArtifactStore, FigureCache, memoize_outputs, registry as figure_caches
+from swingModel import historical_swing, project, swing_modes, tipping_point_swing
+from trendAnalytics import build_trends, electoral_winners, location_turnout, reported_margins, trends_json
+import dataApi
+import httpCaching
+import instrumentation
+from httpCaching import asset_url
+from instrumentation import StageTimer, timed
+
+# Datasets and derived tables (see electionData.load_election_data), set by build_app()
+data = {}
+
+# Every figure embeds its template. Plotly's default one carries the defaults of two dozen
+# trace types, about 7 KB per figure, so the app uses it restricted to the trace types
+# drawn here. Add a type when a figure starts using it.
+template_trace_types = ('choropleth', 'pie', 'scatter', 'bar')
+
+def trimmed_template(name, trace_types):
+    template = pio.templates[name].to_plotly_json()
+    template['data'] = {trace_type: traces for trace_type, traces in template['data'].items() if trace_type in trace_types}
+    for subplot in ('scene', 'polar', 'ternary'):
+        template['layout'].pop(subplot, None)
+    return go.layout.Template(template)
+
+pio.templates['dashboard'] = trimmed_template('plotly', template_trace_types)
+pio.templates.default = 'dashboard'
+
+# Election Night rating colors, DEM-Solid to REP-Solid (see electoralTally.rating_labels)
+color_cycle = ['#08306b', '#2171b5', '#6baed6', '#808080', '#fb6a4a', '#d7301f', '#67000d']
+
+# Discrete color schemes of the Results and Evolution maps, as (labels, colors) per toggle state
+results_color_schemes = {}
+for color_mode, labels in enumerate([
+    ['DEM', 'REP'],
+    ['DEM Solid', 'DEM Likely', 'DEM Lean', 'REP Lean', 'REP Likely', 'REP Solid'],
+]):
+    results_color_schemes[color_mode] = (labels, [margin_bucket_colors[label] for label in labels])
+
+evolution_color_schemes = {
+    0: (['Negative', 'Positive'], ['blue', 'red']),
+    1: (['DEM to DEM', 'REP to DEM', 'DEM to REP', 'REP to REP'],
+        ['#add8e6', '#00008b', '#8b0000', '#ff9999']),  # Light Blue, Dark Blue, Dark Red, Light Red
+}
+
+# Maps are drawn as a single choropleth trace whose z values index the scheme labels,
+# so a color change only touches z, the colorscale and the colorbar labels
+def discrete_color_trace(labels, scheme):
+    names, colors = scheme
+    colorscale = []
+    for i, color in enumerate(colors):
+        colorscale += [(i / len(colors), color), ((i + 1) / len(colors), color)]
+
+    return dict(
+        z=pd.Categorical(labels, categories=names).codes.tolist(),
+        zmin=-0.5,
+        zmax=len(names) - 0.5,
+        colorscale=colorscale,
+        colorbar=dict(
+            tickvals=list(range(len(names))),
+            ticktext=names,
+            tickfont=dict(size=16),
+            orientation='h',
+            yanchor='bottom',
+            y=-0.1,
+            xanchor='center',
+            x=0.5,
+            thickness=15,
+            ticks='',
+            outlinewidth=0
+        )
+    )
+
+def discrete_color_patch(labels, scheme):
+    patch = Patch()
+    for prop, value in discrete_color_trace(labels, scheme).items():
+        patch['data'][0][prop] = value
+    return patch
+
+def discrete_choropleth(locations, labels, scheme, hover_text, title):
+    map_fig = go.Figure(go.Choropleth(
+        locations=locations,
+        locationmode="USA-states",
+        customdata=[[text] for text in hover_text],
+        hovertemplate='%{customdata[0]}<extra></extra>',
+        **discrete_color_trace(labels, scheme)
+    ))
+    map_fig.update_layout(title=title, geo=dict(scope="usa"))
+    return map_fig
+
+def triggered_id():
+    # None when a callback function is called directly (prerender.py, benchmarks)
+    try:
+        return ctx.triggered_id
+    except MissingCallbackContextException:
+        return None
+
+# Single trace Election Night map, z is each state's rating code, the position of its color in color_cycle
+def build_election_night_base_map():
+    electoral_df = data['electoral_df']
+    map_fig = go.Figure(go.Choropleth(
+        locations=electoral_df['state_po'],
+        locationmode="USA-states",
+        hoverinfo='location',
+        showscale=False,
+        **discrete_color_trace([rating_labels[code] for code in electoral_df['rating']], (rating_labels, color_cycle))
+    ))
+    map_fig.update_layout(title="Election Night Map", geo=dict(scope="usa"))
+    return map_fig
+
+# LRU caches of serialized callback outputs, keyed by the normalized inputs.
+# build_app() backs them with the prerendered outputs of prerender.py
+results_cache = FigureCache(maxsize=64, namespace='results')
+evolution_cache = FigureCache(maxsize=1024, namespace='evolution')
+simulation_cache = FigureCache(maxsize=32, namespace='simulation')
+swing_cache = FigureCache(maxsize=512, namespace='swing')
+county_results_cache = FigureCache(maxsize=16, namespace='county_results')
+county_evolution_cache = FigureCache(maxsize=64, namespace='county_evolution')
+trends_cache = FigureCache(maxsize=64, namespace='trends')
+
+# Swings of the Swing tab slider and curve, in margin points towards DEM
+swing_grid = np.arange(-20, 20.5, 0.5)
+
+# Choices of the Simulate panel; callbacks accept nothing else from the client
+simulation_draws = (10000, 100000, 1000000)
+simulation_correlation_range = (0.0, 0.9)
+
+def trend_panel(level='state'):
+    # Trend analytics of every location, computed on first use and kept until live results arrive
+    panels = data.setdefault('trends', {})
+    if level not in panels:
+        engine = data['margin_engine']
+        national_winner = electoral_winners(reported_margins(engine), engine['states'], data['electoral_votes'])
+        if level == 'county':
+            # Counties are compared with the national winner of the same election
+            winners = dict(zip(engine['year_index'], national_winner))
+            county_engine = data['county_engine']
+            panels[level] = build_trends(
+                county_engine, location_turnout(data['county_df'], county_engine, 'county_fips'),
+                np.array([winners.get(year, 0) for year in county_engine['year_index']])
+            )
+        else:
+            panels[level] = build_trends(engine, location_turnout(data['df'], engine), national_winner)
+    return panels[level]
+
+@memoize_outputs(trends_cache, key=lambda level, locations: (level, locations))
+def render_trends(level, locations):
+    return trends_json(trend_panel(level), list(locations) if locations else None)
+
+# Live results (see liveResults.py) swap in new tables one batch at a time, see apply_live_results
+live_results_lock = Lock()
+
+def ingest_live_results(records):
+    with live_results_lock:
+        reported = apply_live_results(data, records)
+
+        # Prerendered outputs describe the source files only, and cached outputs of the reported years are stale
+        for cache in (results_cache, evolution_cache):
+            cache.store = None
+        results_cache.invalidate(lambda key: key[0] in reported)
+        evolution_cache.invalidate(lambda key: key[0] in reported or key[1] in reported)
+        swing_cache.invalidate(lambda key: key[0] in reported)
+        data['trends'] = {}
+        trends_cache.clear()
+        dataApi.invalidate()
+
+        # Election Night starts the reported states of the latest election from their current result
+        latest_year = max(data['results_cube'])
+        if latest_year in reported:
+            leaders = data['results_cube'][latest_year]['states'].set_index('state_po')['margin_label']
+            electoral_df = data['electoral_df']
+            initial_tally = ElectoralTally(dict(data['initial_tally'].ratings), data['electoral_votes'])
+            for state in reported[latest_year]:
+                if state in initial_tally.ratings and leaders.get(state):
+                    initial_tally.set_rating(state, rating_codes[leaders[state].replace(' ', '-')])
+            electoral_df['rating'] = electoral_df['state_po'].astype(str).map(initial_tally.ratings)
+            data['initial_tally'] = initial_tally
+    return reported
+
+# Modules whose code shapes the Results and Evolution outputs, see artifact_fingerprint()
+render_modules = ('dashboard', 'electionData', 'countyData', 'electoralTally', 'figureCache', 'httpCaching')
+
+def artifact_fingerprint():
+    # Key of the prerendered outputs: the data, the rendering code, the assets linked from the
+    # figures (asset_url) and the Plotly/Dash versions, so any of them changing retires the store
+    assets = sorted(
+        os.path.join(httpCaching.assets_folder, name) for name in os.listdir(httpCaching.assets_folder)
+    ) if os.path.isdir(httpCaching.assets_folder) else []
+    code = data_fingerprint(*(sys.modules[name].__file__ for name in render_modules), *assets)
+    return '-'.join((data['fingerprint'], code[:16], plotly.__version__, dash.__version__))
+
+def build_app(dataset, artifact_path, clientside_election_night=False, scenario_store=None, metrics=False,
+              live_results_path=None, live_results_interval=2.0, simulation_workers=1, compression=True,
+              job_queue=None, profile_token=None):
+    data.update(dataset)
+    data['scenario_store'] = scenario_store
+    data['simulation_workers'] = simulation_workers
+    data['job_queue'] = job_queue
+
+    # Map electoral votes and initial colors to each state
+    electoral_df = data['electoral_df']
+    electoral_df['rating'] = electoral_df['polls'].map(rating_codes)
+    electoral_df['electoral_votes'] = electoral_df['college']
+
+    # Position of each state in the Election Night map trace
+    data['election_night_index'] = {state: i for i, state in enumerate(electoral_df['state_po'])}
+    data['electoral_votes'] = electoral_df.set_index('state_po')['electoral_votes'].to_dict()
+    data['initial_tally'] = ElectoralTally(electoral_df.set_index('state_po')['rating'].to_dict(), data['electoral_votes'])
+
+    # Prerendered outputs written by prerender.py, used only if built from the current data and code
+    artifact_store = ArtifactStore(artifact_path, artifact_fingerprint())
+    results_cache.store = artifact_store
+    evolution_cache.store = artifact_store
+
+    # Initialize the Dash app, the callbacks below are registered through dash.callback
+    app = dash.Dash(__name__)
+    app.layout = build_layout()
+
+    if live_results_path:
+        from liveResults import LiveResultsFeed
+        feed = LiveResultsFeed(live_results_path, ingest_live_results, live_results_interval)
+
+        # Rebuild the layout on every page load so sliders and Election Night ratings follow the feed
+        app.layout = build_layout
+
+        @app.server.before_request
+        def start_live_results():
+            feed.ensure_started()
+
+        @app.server.route('/live-results')
+        def live_results_stats():
+            return feed.stats()
+
+    # Per-callback stage timings on /metrics, and a sampling profiler on /debug/profile with a token
+    if metrics:
+        instrumentation.init_app(app.server, profile_token)
+
+    # gzip/brotli responses and long-lived caching of fingerprinted assets
+    if compression:
+        httpCaching.init_app(app.server)
+
+    @app.server.route('/cache-stats')
+    def cache_stats():
+        return {
+            **{namespace: cache.stats() for namespace, cache in figure_caches.items()},
+            'compression': httpCaching.compression_stats(),
+        }
+
+    if 'county_geojson' in data:
+        @app.server.route('/geo/counties.geojson')
+        def county_geojson():
+            # Simplified shapes, built once at startup and cached by the browser; httpCaching
+            # compresses them once and weakens the ETag
+            geojson = data['county_geojson']
+            if flask.request.if_none_match.contains_weak(geojson['etag']):
+                return flask.Response(status=304)
+            response = flask.Response(geojson['payload'], mimetype='application/geo+json')
+            response.set_etag(geojson['etag'])
+            response.cache_control.public = True
+            response.cache_control.max_age = 86400
+            return response
+
+    @app.server.route('/api/swing')
+    def swing_api():
+        # Projection of a base year with a swing, plus the DEM electoral votes over the swing grid
+        args = flask.request.args
+        try:
+            base_year = int(args.get('base_year', max(data['margin_engine']['year_index'])))
+            mode = args.get('mode', 'uniform')
+            swing = float(args.get('swing', 0))
+        except ValueError:
+            flask.abort(400)
+        if base_year not in data['margin_engine']['year_index'] or mode not in swing_modes or not np.isfinite(swing):
+            flask.abort(400)
+
+        engine, electoral_votes = data['margin_engine'], data['electoral_votes']
+        projection = project(engine, electoral_votes, base_year, [swing], mode)
+        return {
+            'base_year': base_year,
+            'mode': mode,
+            'swing': swing,
+            'dem_ev': int(projection['dem_ev'][0]),
+            'rep_ev': int(projection['rep_ev'][0]),
+            'states': {
+                state: {'dem': round(float(dem), 4), 'rep': round(float(rep), 4), 'winner': 'DEM' if won else 'REP'}
+                for state, dem, rep, won in zip(
+                    projection['states'], projection['dem_pct'][0], projection['rep_pct'][0], projection['dem_won'][0]
+                )
+            },
+            'tipping_point': tipping_point_swing(engine, electoral_votes, base_year, mode),
+            'grid': {
+                'swings': swing_grid.tolist(),
+                'dem_ev': project(engine, electoral_votes, base_year, swing_grid, mode)['dem_ev'].tolist(),
+            },
+        }
+
+    # Bulk JSON/Arrow results for downstream consumers, see dataApi.py
+    dataApi.init_app(app.server, data)
+
+    @app.server.route('/api/trends')
+    def trends_api():
+        # Lean, swing, volatility, bellwether and realignment of every state (or county),
+        # ?location=OH&location=PA restricts the answer to some locations
+        level = flask.request.args.get('level', 'state')
+        if level not in ('state', 'county') or (level == 'county' and 'county_engine' not in data):
+            flask.abort(400)
+        locations = tuple(sorted(set(flask.request.args.getlist('location'))))
+        return render_trends(level, locations)
+
+    if job_queue is not None:
+        # Simulations run in the job pool, the request only submits and polls
+        app.callback(
+            simulation_outputs + [Output('simulation-progress', 'children'), Output('simulation-job', 'data'),
+                                  Output('simulation-poll', 'disabled')],
+            simulation_inputs + [Input('simulation-poll', 'n_intervals')],
+            simulation_states + [State('simulation-job', 'data')],
+            prevent_initial_call=True
+        )(update_simulation_job)
+
+        @app.server.route('/jobs')
+        def job_stats():
+            return job_queue.stats()
+    else:
+        app.callback(simulation_outputs, simulation_inputs, simulation_states, prevent_initial_call=True)(
+            update_simulation
+        )
+
+    if clientside_election_night:
+        # Clicks never reach the server, only the clicked state's z value is rewritten
+        app.clientside_callback(
+            ClientsideFunction(namespace='electionNight', function_name='cycleState'),
+            election_night_outputs + [Output('rating-store', 'data')],
+            [Input('us-map-election-night', 'clickData')],
+            [State('us-map-election-night', 'figure'), State('rating-store', 'data'), State('vote-store', 'data')]
+        )
+    elif scenario_store is not None:
+        # Requests carry the scenario handle instead of the color and vote stores
+        app.callback(
+            election_night_outputs + [Output('scenario-id', 'data')],
+            [Input('us-map-election-night', 'clickData')],
+            [State('scenario-id', 'data')]
+        )(update_scenario_map)
+    else:
+        app.callback(
+            election_night_outputs + [Output('rating-store', 'data')],
+            [Input('us-map-election-night', 'clickData')],
+            [State('rating-store', 'data'), State('vote-store', 'data')]
+        )(update_map_and_scoreboard)
+
+    return app
+
+# State or county maps, only offered when county data is loaded (see countyData.py)
+def level_selector(component_id):
+    return html.Div([
+        dcc.RadioItems(
+            id=component_id,
+            options=[{'label': 'States', 'value': 'state'}, {'label': 'Counties', 'value': 'county'}],
+            value='state',
+            inline=True
+        ),
+        html.Br()
+    ], style={} if 'county_cube' in data else {'display': 'none'})
+
+# Define the layout of the app with tabs for "Results" and "Evolution"
+def build_layout():
+    years = sorted(data['year_offsets'])  # Election years of the year-sorted results table
+
+    return html.Div([
+        # Header with logos and title
+        html.Div([
+            html.Img(src=asset_url("presi.png"), style={'height': '100px', 'float': 'left'}),
+            html.Img(src=asset_url("usflag.png"), style={'height': '100px', 'float': 'right'}),
+            html.H1(
+                "US Elections Dashboard",
+                style={
+                    'textAlign': 'center', 
+                    'color': 'black', 
+                    'backgroundColor': 'gold',
+                    'padding': '0 20px', 
+                    'borderRadius': '10px', 
+                    'width': '50%', 
+                    'margin': '0 auto', 
+                    'height': '100px', 
+                    'lineHeight': '100px'  # Vertically centers the text
+                }
+            )
+        ], style={'marginBottom': '20px'}),
+
+        dcc.Tabs([
+            #Results tabs
+            dcc.Tab(label="Results", children=[
+                html.Br(),
+                #selector
+                html.Div([
+                    html.Div([
+                        html.Br(),
+                        html.Button("Change Color", id="toggle-button", n_clicks=0),
+                        html.Br(),html.Br(),
+                        level_selector('results-level'),
+                        html.Label("Select Election Year"),
+                        dcc.Slider(
+                            id='year-slider-results',
+                            min=years[0],
+                            max=years[-1],
+                            value=years[-1],
+                            marks={str(year): str(year) for year in years},
+                            step=None
+                        ),
+                    
+                    ], style={'width': '20%', 'display': 'inline-block', 'vertical-align': 'top', 
+                              'border': '2px solid black', 'padding': '20px', 'borderRadius': '5px'}),
+
+
+                    html.Div([
+                        # Democratic section
+                        html.Div([
+                            html.Img(src=asset_url("dem.png"), style={'height': '80px', 'margin-right': '15px'}),
+                            html.Span(id='dem-states-count', style={'fontSize': '50px', 'color': 'black', 'margin-left': '30px'})
+                        ], style={'display': 'flex', 'alignItems': 'center', 'justifyContent': 'center', 'width': '45%', 'textAlign': 'center'}),
+
+                        # VS image section, centered
+                        html.Div([
+                            html.Img(src=asset_url("versus.jpg"), style={'height': '80px', 'margin': '0 auto'})  # Centered 'VS' image
+                        ], style={'display': 'flex', 'alignItems': 'center', 'justifyContent': 'center', 'width': '10%', 'textAlign': 'center'}),
+
+                        # Republican section
+                        html.Div([
+                            html.Span(id='rep-states-count', style={'fontSize': '50px', 'color': 'black', 'margin-right': '30px'}),
+                            html.Img(src=asset_url("rep.png"), style={'height': '80px', 'margin-left': '15px'})
+                        ], style={'display': 'flex', 'alignItems': 'center', 'justifyContent': 'center', 'width': '45%', 'textAlign': 'center'})
+
+                    ], style={
+                        'width': '40%',  # Adjusted width to fit and center within the page
+                        'margin': '0 auto',  # Centers the entire block horizontally
+                        'display': 'flex', 'justifyContent': 'space-between', 
+                        'border': '6px dotted black', 'padding': '20px', 'borderRadius': '5px', 'textAlign': 'center'
+                    }),
+
+
+
+                    html.Div([
+                        html.Div([
+                            html.H2("WINNER", style={'fontSize': '24px', 'color': 'black', 'marginBottom': '10px'}),
+                            html.Img(id='winner-logo', style={'height': '80px', 'marginBottom': '10px'}),
+                            html.Span(id='winner-text', style={'fontSize': '20px', 'fontWeight': 'bold', 'color': 'black'})
+                        ], style={'display': 'flex', 'flexDirection': 'column', 'alignItems': 'center', 'textAlign': 'center', 'justifyContent': 'center'})
+                    ], style={
+                        'width': '20%', 'margin': '0 auto', 
+                        'border': '4px solid gold', 'padding': '20px', 'borderRadius': '5px', 'textAlign': 'center',
+                    }),
+                
+                ], style={'textAlign': 'center', 'width': '100%', 'display': 'flex', 'justify-content': 'space-between'}),
+
+                html.Br(),
+
+                #Map & tables
+                html.Div([
+                    html.Div([
+                        html.H4("Closest Races"),
+                        html.Div(id='closest-races', style={'margin-top': '20px'}),
+                    ], style={'width': '20%', 'display': 'inline-block', 'vertical-align': 'top'}),
+                
+                
+
+                    # Map in the center
+                    html.Div([
+                        dcc.Graph(id='us-map-results', style={'height': '60vh'}),
+                    ], style={'width': '55%', 'display': 'inline-block', 'text-align': 'center'}),
+
+                    # Furthest Races table on the right
+                    html.Div([
+                        html.H4("Furthest Races"),
+                        html.Div(id='furthest-races', style={'margin-top': '20px'}),
+                    ], style={'width': '20%', 'display': 'inline-block', 'vertical-align': 'top'})
+                ], style={'textAlign': 'center', 'width': '100%', 'display': 'flex', 'justify-content': 'space-around'}),
+
+                # Additional graph below the main layout if needed
+                html.Div([
+                    dcc.Graph(id='state-graph', style={'height': '60vh'})
+                ], style={'width': '100%', 'display': 'inline-block', 'margin-top': '20px'}),
+            ]),
+
+            #Evolution tabs
+            dcc.Tab(label="Evolution", children=[
+                html.Br(),
+                html.Div([
+                    html.Div([
+                        html.Button("Change Color", id="toggle-button-2", n_clicks=0),
+                        html.Br(),html.Br(),
+                        level_selector('evolution-level'),
+                        html.Label("Select Data to Display"),
+                        dcc.Dropdown(
+                            id='data-selector',
+                            options=[
+                                {'label': 'REP', 'value': 'REP'},
+                                {'label': 'DEM', 'value': 'DEM'},
+                                {'label': 'Margin', 'value': 'MARGIN'}
+                            ] + [
+                                # Third parties and write-ins found in the results
+                                {'label': party, 'value': party}
+                                for party in data['margin_engine']['party_index'] if party not in ('DEM', 'REP')
+                            ],
+                            value='MARGIN'
+                        ),
+                    ], style={'width': '20%', 'display': 'inline-block', 'vertical-align': 'top'}),
+
+                    html.Div([
+                        html.Label("Select Start Year"),
+                        dcc.Slider(
+                            id='start-year-slider',
+                            min=years[0],
+                            max=years[-1],
+                            value=years[0],
+                            marks={str(year): str(year) for year in years},
+                            step=None
+                        ),
+                        html.Label("Select End Year"),
+                        dcc.Slider(
+                            id='end-year-slider',
+                            min=years[0],
+                            max=years[-1],
+                            value=years[-1],
+                            marks={str(year): str(year) for year in years},
+                            step=None
+                        ),
+                        html.Br(),
+                    ], style={'width': '20%', 'display': 'inline-block', 'vertical-align': 'top', 'text-align': 'center'}),
+                
+
+                    html.Br(),
+
+                    # Map & tables for evolution
+                    html.Div([
+                        html.Div([
+                            html.H4("DEM Sweeps"),
+                            html.Div(id='closest-margin', style={'margin-top': '20px'}),
+                        ], style={'width': '20%', 'display': 'inline-block', 'vertical-align': 'top'}),
+                    
+
+                        # Map in the center
+                        html.Div([
+                            dcc.Graph(id='us-map-evolution', style={'height': '80vh'})
+                        ], style={'width': '55%', 'display': 'inline-block', 'text-align': 'center'}),
+
+                        # Furthest Races table on the right
+                        html.Div([
+                            html.H4("REP Sweeps"),
+                            html.Div(id='furthest-margin', style={'margin-top': '20px'}),
+                        ], style={'width': '20%', 'display': 'inline-block', 'vertical-align': 'top'})
+                    ], style={'textAlign': 'center', 'width': '100%', 'display': 'flex', 'justify-content': 'space-around'}),
+            
+                ]),
+            ]),
+    
+            # Swing tab: a base year replayed with a uniform or proportional swing
+            dcc.Tab(label="Swing", children=[
+                html.Br(),
+                html.Div([
+                    html.Div([
+                        html.Label("Select Base Year"),
+                        dcc.Slider(
+                            id='swing-base-year',
+                            min=years[0],
+                            max=years[-1],
+                            value=years[-1],
+                            marks={str(year): str(year) for year in years},
+                            step=None
+                        ),
+                        html.Br(),
+                        html.Label("Swing Model"),
+                        dcc.RadioItems(
+                            id='swing-mode',
+                            options=[{'label': mode.title(), 'value': mode} for mode in swing_modes],
+                            value='uniform',
+                            inline=True
+                        ),
+                        html.Br(),
+                        html.Label("Apply a Historical Swing"),
+                        dcc.Dropdown(
+                            id='swing-history',
+                            options=[
+                                {'label': f"{start} to {end}", 'value': f"{start}-{end}"}
+                                for start, end in zip(years[:-1], years[1:])
+                            ],
+                            placeholder="Previous elections"
+                        ),
+                        html.Br(),
+                        html.Label("Swing to DEM (margin points)"),
+                        dcc.Slider(
+                            id='swing-slider',
+                            min=swing_grid[0],
+                            max=swing_grid[-1],
+                            step=0.5,
+                            value=0,
+                            marks={int(swing): f"{swing:+.0f}" for swing in swing_grid[::10]},
+                            tooltip={'placement': 'bottom'}
+                        ),
+                        html.Br(),
+                        html.Div(id='swing-tipping-point', style={'fontSize': '18px'})
+                    ], style={'width': '25%', 'display': 'inline-block', 'vertical-align': 'top',
+                              'border': '2px solid black', 'padding': '20px', 'borderRadius': '5px'}),
+
+                    html.Div([
+                        html.Div([
+                            html.Img(src=asset_url("dem.png"), style={'height': '60px', 'margin-right': '15px'}),
+                            html.Span(id='swing-dem-votes', style={'fontSize': '40px', 'color': 'black'}),
+                            html.Span(" - ", style={'fontSize': '40px', 'padding': '0 20px'}),
+                            html.Span(id='swing-rep-votes', style={'fontSize': '40px', 'color': 'black'}),
+                            html.Img(src=asset_url("rep.png"), style={'height': '60px', 'margin-left': '15px'})
+                        ], style={'display': 'flex', 'alignItems': 'center', 'justifyContent': 'center'}),
+                        dcc.Graph(id='us-map-swing', style={'height': '60vh'})
+                    ], style={'width': '45%', 'display': 'inline-block', 'text-align': 'center'}),
+
+                    html.Div([
+                        dcc.Graph(id='swing-curve')
+                    ], style={'width': '28%', 'display': 'inline-block', 'vertical-align': 'top'})
+                ], style={'textAlign': 'center', 'width': '100%', 'display': 'flex', 'justify-content': 'space-around'}),
+            ]),
+
+            # Election Night tab
+            dcc.Tab(label="Election Night", children=[
+                            html.Br(),
+                #selector
+                html.Div([
+
+                    #Change color
+                    html.Div([
+                        html.Br(),
+                        html.Button("Change Color", id="toggle-button-3", n_clicks=0),
+                        html.Br(),html.Br(),
+                        html.Label("Select Election Year"),
+                        dcc.Slider(
+                            id='year-slider-results-3',
+                            min=years[0],
+                            max=years[-1],
+                            value=years[-1],
+                            marks={str(year): str(year) for year in years},
+                            step=None
+                        ),
+                    
+                    ], style={'width': '20%', 'display': 'inline-block', 'vertical-align': 'top', 
+                              'border': '2px solid black', 'padding': '20px', 'borderRadius': '5px'}),
+
+                    #Scoreboard
+                    html.Div([
+                        # Democratic section
+                        html.Div([
+                            html.Img(src=asset_url("dem.png"), style={'height': '80px', 'margin-right': '15px'}),
+                            html.Span(id='dem-electoral-votes', style={'fontSize': '50px', 'color': 'black', 'margin-left': '30px'})
+                        ], style={'display': 'flex', 'alignItems': 'center', 'justifyContent': 'center', 'width': '45%', 'textAlign': 'center'}),
+
+                        # VS image section, centered
+                        html.Div([
+                            html.Img(src=asset_url("versus.jpg"), style={'height': '80px', 'margin': '0 auto'})  # Centered 'VS' image
+                        ], style={'display': 'flex', 'alignItems': 'center', 'justifyContent': 'center', 'width': '10%', 'textAlign': 'center'}),
+
+                        # Republican section
+                        html.Div([
+                            html.Span(id='rep-electoral-votes', style={'fontSize': '50px', 'color': 'black', 'margin-right': '30px'}),
+                            html.Img(src=asset_url("rep.png"), style={'height': '80px', 'margin-left': '15px'})
+                        ], style={'display': 'flex', 'alignItems': 'center', 'justifyContent': 'center', 'width': '45%', 'textAlign': 'center'})
+
+                    ], style={
+                        'width': '40%',  # Adjusted width to fit and center within the page
+                        'margin': '0 auto',  # Centers the entire block horizontally
+                        'display': 'flex', 'justifyContent': 'space-between', 
+                        'border': '6px dotted black', 'padding': '20px', 'borderRadius': '5px', 'textAlign': 'center'
+                    }),
+
+                    #Winner
+                    html.Div([
+                        html.Div([
+                            html.H2("WINNER", style={'fontSize': '24px', 'color': 'black', 'marginBottom': '10px'}),
+                            html.Img(id='winner-logo-2', style={'height': '80px', 'marginBottom': '10px'}),
+                            html.Span(id='winner-text-2', style={'fontSize': '20px', 'fontWeight': 'bold', 'color': 'black'})
+                        ], style={'display': 'flex', 'flexDirection': 'column', 'alignItems': 'center', 'textAlign': 'center', 'justifyContent': 'center'})
+                    ], style={
+                        'width': '20%', 'margin': '0 auto', 
+                        'border': '4px solid gold', 'padding': '20px', 'borderRadius': '5px', 'textAlign': 'center',
+                    }),
+                
+                ], style={'textAlign': 'center', 'width': '100%', 'display': 'flex', 'justify-content': 'space-between'}),
+
+                html.Br(),
+                html.Br(),
+                # Scoreboard for electoral votes
+                # html.Div([
+                #     html.H3("Election Night Dashboard", style={'textAlign': 'center'}),
+                #     html.Div([
+                #         html.Span("Democrats: ", style={'color': 'blue', 'fontSize': '24px'}),
+                #         html.Div(id='dem-electoral-votes-2', style={'color': 'blue', 'fontSize': '24px'}),
+                #         html.Span("vs", style={'fontSize': '24px', 'padding': '0 10px'}),
+                #         html.Div(id='rep-electoral-votes-2', style={'color': 'red', 'fontSize': '24px'})
+                #     ], style={'display': 'flex', 'justifyContent': 'center', 'gap': '20px', 'padding': '10px'}),
+                # ]),
+
+                # Interactive map for Election Night
+                dcc.Graph(
+                    id='us-map-election-night',
+                    figure=build_election_night_base_map()
+                ),
+
+                # Remaining tossups and each party's path to 270
+                html.Div(id='path-to-270', style={'textAlign': 'center', 'fontSize': '18px'}),
+
+                html.Br(),
+                # Monte Carlo simulation of the current ratings
+                html.Div([
+                    html.Div([
+                        html.Label("Simulated Elections"),
+                        dcc.Dropdown(
+                            id='simulation-draws',
+                            options=[{'label': f"{draws:,}", 'value': draws} for draws in simulation_draws],
+                            value=100000,
+                            clearable=False
+                        ),
+                        html.Br(),
+                        html.Label("National Swing Correlation"),
+                        dcc.Slider(
+                            id='simulation-correlation', min=simulation_correlation_range[0],
+                            max=simulation_correlation_range[1], step=0.1, value=0.5
+                        ),
+                        html.Br(),
+                        html.Button("Simulate", id='simulate-button', n_clicks=0),
+                        html.Br(), html.Br(),
+                        html.Div(id='simulation-summary', style={'fontSize': '18px'}),
+
+                        # Progress of the simulation running as a background job (see backgroundJobs.py)
+                        html.Div(id='simulation-progress'),
+                        dcc.Store(id='simulation-job'),
+                        dcc.Interval(id='simulation-poll', interval=500, disabled=True)
+                    ], style={'width': '20%', 'display': 'inline-block', 'vertical-align': 'top',
+                              'border': '2px solid black', 'padding': '20px', 'borderRadius': '5px'}),
+
+                    html.Div([
+                        dcc.Graph(id='simulation-histogram')
+                    ], style={'width': '50%', 'display': 'inline-block'}),
+
+                    html.Div([
+                        html.H3("Tipping Point States"),
+                        html.Div(id='simulation-tipping')
+                    ], style={'width': '25%', 'display': 'inline-block', 'vertical-align': 'top'})
+                ], style={'display': 'flex', 'justifyContent': 'space-between'}),
+
+                # Hidden div for storing state ratings, their electoral vote totals and electoral counts
+                dcc.Store(id='rating-store', data=data['initial_tally'].to_store()),
+                dcc.Store(id='vote-store', data=data['electoral_votes']),
+
+                # Handle of the server-side scenario, kept across page reloads
+                dcc.Store(id='scenario-id', storage_type='local')
+            ]),
+
+                    #Results tabs
+
+        ])
+    ])
+
+# Callback Results
+@callback(
+    [Output('winner-logo', 'src'), Output('winner-text', 'children')],
+    [Input('dem-states-count', 'children'), Input('rep-states-count', 'children')]
+)
+
+@timed
+def update_winner_logo_and_text(dem_count, rep_count):
+    if int(dem_count) > int(rep_count):
+        return asset_url("dem.png"), "Democratic Party"  # Path to Democratic logo and text
+    else:
+        return asset_url("rep.png"), "Republican Party"  # Path to Republican logo and text
+
+@callback(
+    [Output('us-map-results', 'figure'), Output('closest-races', 'children'),
+    Output('furthest-races', 'children'), Output('state-graph', 'figure'),
+    Output('dem-states-count', 'children'), Output('rep-states-count', 'children')],
+    [Input('year-slider-results', 'value'), Input('toggle-button', 'n_clicks'), Input('results-level', 'value')]
+)
+
+@timed
+def update_results_map(selected_year, n_clicks, level='state'):
+    if level == 'county' and selected_year not in data['county_cube']:
+        return (dash.no_update,) * 6  # No county results for this year
+
+    # Recolor the current map in place when only the color toggle changed
+    if triggered_id() == 'toggle-button':
+        cube = data['county_cube'] if level == 'county' else data['results_cube']
+        labels = results_color_labels(cube[selected_year], n_clicks % 2)
+        patch = discrete_color_patch(labels, results_color_scheme(cube[selected_year], n_clicks % 2))
+        return (patch,) + (dash.no_update,) * 5
+
+    if level == 'county':
+        return render_county_results(selected_year, n_clicks % 2)
+    return render_results(selected_year, n_clicks % 2)
+
+def results_color_labels(year_results, color_mode):
+    # 6-color scheme based on margin levels, or the default bicolor scheme
+    locations = year_results['counties'] if 'counties' in year_results else year_results['states']
+    labels = locations['margin_label' if color_mode == 1 else 'party']
+    if year_results.get('other_count'):
+        labels = labels.astype(str).where(locations['party'].isin(['DEM', 'REP']), 'Other')
+    return labels
+
+def results_color_scheme(year_results, color_mode):
+    # Years with third-party winners get an extra 'Other' color
+    names, colors = results_color_schemes[color_mode]
+    if year_results.get('other_count'):
+        return names + ['Other'], colors + [margin_bucket_colors['Other']]
+    return names, colors
+
+def party_pie(year_results, value_name, title):
+    # DEM and REP, plus the third parties together when they won anywhere
+    parties = ['DEM', 'REP']
+    counts = [year_results['dem_count'], year_results['rep_count']]
+    if year_results.get('other_count'):
+        parties.append('Other')
+        counts.append(year_results['other_count'])
+
+    pie_fig = px.pie(
+        pd.DataFrame({'party': parties, value_name: counts}),
+        values=value_name,
+        names='party',
+        color='party',
+        color_discrete_map={'DEM': 'blue', 'REP': 'red', 'Other': margin_bucket_colors['Other']},
+        title=title,
+        hole=0.4  # For a donut chart
+    )
+    pie_fig.update_traces(textinfo='label+value', textfont_size=16)
+    return pie_fig
+
+@memoize_outputs(results_cache, key=lambda selected_year, color_mode: (int(selected_year), color_mode))
+def render_results(selected_year, color_mode):
+    timer = StageTimer()
+
+    # Look up the precomputed results for the selected year
+    year_results = data['results_cube'][selected_year]
+    leading_party = year_results['states']
+    timer.mark('data')
+
+    # Generate the table for closest races
+    closest_table = dash_table.DataTable(
+        data=year_results['closest'],
+        columns=[
+            {"name": "#", "id": "n"},
+            {"name": "State", "id": "state"},
+            {"name": "Winner", "id": "party"},
+            {"name": "Margin (%)", "id": "margin"}
+        ],
+        style_table={'height': '400px', 'overflowY': 'auto'},
+        style_cell={'textAlign': 'left'},
+        style_header={'fontWeight': 'bold'},
+        style_data_conditional=[
+            {'if': {'filter_query': '{party} = "DEM"'}, 'backgroundColor': 'lightblue'},
+            {'if': {'filter_query': '{party} = "REP"'}, 'backgroundColor': 'lightcoral'}
+        ]
+    )
+
+    # Generate the table for furthest races
+    furthest_table = dash_table.DataTable(
+        data=year_results['furthest'],
+        columns=[
+            {"name": "#", "id": "n"},
+            {"name": "State", "id": "state"},
+            {"name": "Winner", "id": "party"},
+            {"name": "Margin (%)", "id": "margin"}
+        ],
+        style_table={'height': '400px', 'overflowY': 'auto'},
+        style_cell={'textAlign': 'left'},
+        style_header={'fontWeight': 'bold'},
+        style_data_conditional=[
+            {'if': {'filter_query': '{party} = "DEM"'}, 'backgroundColor': 'lightblue'},
+            {'if': {'filter_query': '{party} = "REP"'}, 'backgroundColor': 'lightcoral'}
+        ]
+    )
+
+    #FIGURE
+
+    fig = discrete_choropleth(
+        leading_party['state_po'],
+        results_color_labels(year_results, color_mode),
+        results_color_scheme(year_results, color_mode),
+        leading_party['hover_text'],
+        title=f"U.S. Presidential Election Results - {selected_year}"
+    )
+
+    # Update layout to center title, add golden border, and raise legend position
+    fig.update_layout(
+        title={
+            'text': f"{selected_year} Presidential Results",
+            'x': 0.5, 'y': 0.9,
+            'xanchor': 'center', 'yanchor': 'top',
+            'font': {'size': 24, 'family': 'Arial, sans-serif', 'color': 'black'}
+        },
+        legend=dict(
+            title_text='',
+            itemsizing='constant',
+            font=dict(size=16),
+            orientation="h",
+            yanchor="bottom",
+            y=-0.1,  # Raise the legend slightly higher
+            xanchor="center",
+            x=0.5
+        ),
+        margin=dict(l=0, r=0, t=50, b=20),  # Minimal margins around the map
+        paper_bgcolor='white',               # Background of the entire map area
+        plot_bgcolor='white',                # Background inside the map
+        geo=dict(
+            showframe=True,                  # Enable frame around the map
+            framecolor="gold",               # Golden frame color
+            framewidth=3,                    # Thicker frame width for visibility
+            bgcolor='white'                  # Ensure map background remains white
+        )
+    )
+
+
+    #PIE CHART
+    dem_count = year_results['dem_count']
+    rep_count = year_results['rep_count']
+    pie_fig = party_pie(year_results, 'state_count', "States Won by Party")
+    timer.mark('figure')
+
+    return fig, closest_table, furthest_table, pie_fig, dem_count, rep_count
+
+# Callback Evolution
+
+@callback(
+    [Output('us-map-evolution', 'figure'),
+    Output('closest-margin', 'children'), Output('furthest-margin', 'children')],
+    [Input('start-year-slider', 'value'), Input('end-year-slider', 'value'),
+     Input('data-selector', 'value'), Input('toggle-button-2', 'n_clicks'), Input('evolution-level', 'value')]
+)
+
+@timed
+def update_evolution_map(start_year, end_year, data_selector, n_clicks, level='state'):
+    engine = data['county_engine'] if level == 'county' else data['margin_engine']
+    if start_year not in engine['year_index'] or end_year not in engine['year_index']:
+        return dash.no_update, dash.no_update, dash.no_update  # No county results for these years
+    if data_selector != 'MARGIN' and data_selector not in engine['party_index']:
+        return dash.no_update, dash.no_update, dash.no_update  # Party not on the county ballots
+
+    # The color toggle only applies to the margin map, recolor it in place
+    if triggered_id() == 'toggle-button-2':
+        if data_selector != 'MARGIN':
+            return dash.no_update, dash.no_update, dash.no_update
+        margin_df = evolution_frame(engine, start_year, end_year, data_selector)
+        labels = margin_color_labels(margin_df, n_clicks % 2)
+        patch = discrete_color_patch(labels, evolution_color_schemes[n_clicks % 2])
+        return patch, dash.no_update, dash.no_update
+
+    if level == 'county':
+        return render_county_evolution(start_year, end_year, data_selector, n_clicks % 2)
+    return render_evolution(start_year, end_year, data_selector, n_clicks % 2)
+
+def margin_color_labels(margin_df, color_mode):
+    if color_mode == 1:
+        # Use the 4-color scheme if the button is clicked
+        rep_start = margin_df['margin_start'].to_numpy() > 0
+        rep_end = margin_df['margin_end'].to_numpy() > 0
+        return np.select(
+            [rep_start & rep_end, rep_start, rep_end],
+            ['REP to REP', 'REP to DEM', 'DEM to REP'],
+            'DEM to DEM'
+        )
+    # Default bicolor scheme based on margin change
+    return np.where(margin_df['change'].to_numpy() > 0, 'Positive', 'Negative')
+
+def evolution_records(ranking, data_selector, location_key='state_po', names=None):
+    # Rows of an Evolution table from an evolution_rankings() entry; for the margin the
+    # party column is the side the state moved towards
+    locations, changes = ranking
+    if names is not None:
+        locations = [names[location] for location in locations]
+    return [
+        {'n': i + 1, location_key: str(location),
+         'party': data_selector if data_selector != 'MARGIN' else ('REP' if change > 0 else 'DEM'),
+         'change': float(change)}
+        for i, (location, change) in enumerate(zip(locations, changes))
+    ]
+
+def change_limit(frame):
+    # Bound of a diverging color scale centered at 0; 1 when no location reported both years
+    # (a party on the ballot in only one of them) or nothing changed
+    changes = frame['change'].abs()
+    return float(changes.max()) if len(changes) and changes.max() > 0 else 1.0
+
+def change_hover_text(frame, start_column, end_column, start_year, end_year):
+    # Hover text of the Evolution maps: both years and the change, in points
+    return hover_text(
+        frame['state_po'],
+        np.char.add(f"{start_year}: ", percent_text(100 * frame[start_column].to_numpy())),
+        np.char.add(f"{end_year}: ", percent_text(100 * frame[end_column].to_numpy())),
+        np.char.add(np.char.add('Change: <b>', percent_text(100 * frame['change'].to_numpy(), signed=True)), '</b>'),
+    ).astype(object)
+
+@memoize_outputs(
+    evolution_cache,
+    key=lambda start_year, end_year, data_selector, color_mode: (int(start_year), int(end_year), data_selector, color_mode)
+)
+def render_evolution(start_year, end_year, data_selector, color_mode):
+    timer = StageTimer()
+
+    # Initialize variables
+    fig = None
+    closest_table = None
+    sweeps_table = None
+
+    # 1. Calculate margin if "MARGIN" is selected.
+    if data_selector == 'MARGIN':
+        # Look up the REP-DEM margins of both years and their change
+        margin_df = evolution_frame(data['margin_engine'], start_year, end_year, data_selector)
+        
+        # Create custom hover text
+        margin_df['hover_text'] = change_hover_text(margin_df, 'margin_start', 'margin_end', start_year, end_year)
+
+        timer.mark('data')
+
+        # 2. Define fig for margin evolution with the selected color scheme
+        fig = discrete_choropleth(
+            margin_df['state_po'],
+            margin_color_labels(margin_df, color_mode),
+            evolution_color_schemes[color_mode],
+            margin_df['hover_text'],
+            title=f"Margin Change from {start_year} to {end_year}"
+        )
+
+        # 3. Generate tables for closest and furthest margin changes, ranked at load time
+        closest_evolutions, biggest_sweeps = evolution_rankings(
+            data['margin_engine'], data['evolution_index'], start_year, end_year, data_selector
+        )
+
+        closest_table = dash_table.DataTable(
+            data=evolution_records(closest_evolutions, data_selector),
+            columns=[
+                {"name": "#", "id": "n"},
+                {"name": "State", "id": "state_po"},
+                {"name": "Winner", "id": "party"},
+                {"name": "Margin Change (%)", "id": "change"}
+            ],
+            style_table={'height': '400px', 'overflowY': 'auto'},
+            style_cell={'textAlign': 'left'},
+            style_header={'fontWeight': 'bold'},
+            style_data_conditional=[
+                {'if': {'filter_query': '{party} = "DEM"'}, 'backgroundColor': 'lightblue'},
+                {'if': {'filter_query': '{party} = "REP"'}, 'backgroundColor': 'lightcoral'}
+            ]
+        )
+
+        # Generate the table for biggest sweeps
+        sweeps_table = dash_table.DataTable(
+            data=evolution_records(biggest_sweeps, data_selector),
+            columns=[
+                {"name": "#", "id": "n"},
+                {"name": "State", "id": "state_po"},
+                {"name": "Winner", "id": "party"},
+                {"name": "Margin Change (%)", "id": "change"}
+            ],
+            style_table={'height': '400px', 'overflowY': 'auto'},
+            style_cell={'textAlign': 'left'},
+            style_header={'fontWeight': 'bold'},
+            style_data_conditional=[
+                {'if': {'filter_query': '{party} = "DEM"'}, 'backgroundColor': 'lightblue'},
+                {'if': {'filter_query': '{party} = "REP"'}, 'backgroundColor': 'lightcoral'}
+            ]
+        )
+    
+    
+    else:
+        # 4. Process data for the selected party directly if "REP" or "DEM" is chosen in `data_selector`
+        party_df = evolution_frame(data['margin_engine'], start_year, end_year, data_selector)
+
+        # Create custom hover text
+        party_df['hover_text'] = change_hover_text(party_df, 'pct_start', 'pct_end', start_year, end_year)
+
+        timer.mark('data')
+
+        # Define color scale based on the selected party with white centered at 0
+        color_scale = [(0, 'blue'), (0.5, 'white'), (1, 'red')] if data_selector == 'REP' else [(0, 'red'), (0.5, 'white'), (1, 'blue')]
+
+        fig = px.choropleth(
+            party_df,
+            locations='state_po',
+            locationmode="USA-states",
+            color='change',
+            color_continuous_scale=color_scale,
+            range_color=[-change_limit(party_df), change_limit(party_df)],
+            scope="usa",
+            title=f"{data_selector} Change from {start_year} to {end_year}",
+            hover_name='state_po',
+            custom_data=['hover_text']
+        )
+        fig.update_traces(hovertemplate='%{customdata[0]}')
+
+        # Update layout to center the title and format the map display
+        fig.update_layout(
+            title={
+                'text': f"{data_selector} Change from {start_year} to {end_year}",
+                'x': 0.5, 'y': 0.9,
+                'xanchor': 'center', 'yanchor': 'top',
+                'font': {'size': 24, 'family': 'Arial, sans-serif', 'color': 'black'}
+            },
+            legend=dict(
+                title_text='Change',
+                itemsizing='constant',
+                font=dict(size=16),
+                orientation="h",
+                yanchor="bottom",
+                y=-0.1,  # Raise the legend slightly higher
+                xanchor="center",
+                x=0.5
+            ),
+            margin=dict(l=0, r=0, t=50, b=20),  # Minimal margins around the map
+            paper_bgcolor='white',               # Background of the entire map area
+            plot_bgcolor='white',                # Background inside the map
+            geo=dict(
+                showframe=True,                  # Enable frame around the map
+                framecolor="gold",               # Golden frame color
+                framewidth=3,                    # Thicker frame width for visibility
+                bgcolor='white'                  # Ensure map background remains white
+            )
+        )
+
+        # Generate tables for closest and furthest changes in selected party percentage
+        closest_changes, furthest_changes = evolution_rankings(
+            data['margin_engine'], data['evolution_index'], start_year, end_year, data_selector
+        )
+
+        closest_table = dash_table.DataTable(
+            data=evolution_records(closest_changes, data_selector),
+            columns=[
+                {"name": "#", "id": "n"},
+                {"name": "State", "id": "state_po"},
+                {"name": "Party", "id": "party"},
+                {"name": "Change (%)", "id": "change"}
+            ],
+            style_table={'height': '400px', 'overflowY': 'auto'},
+            style_cell={'textAlign': 'left'},
+            style_header={'fontWeight': 'bold'},
+            style_data_conditional=[
+                {'if': {'filter_query': '{party} = "DEM"'}, 'backgroundColor': 'lightblue'},
+                {'if': {'filter_query': '{party} = "REP"'}, 'backgroundColor': 'lightcoral'}
+            ]
+        )
+
+        sweeps_table = dash_table.DataTable(
+            data=evolution_records(furthest_changes, data_selector),
+            columns=[
+                {"name": "#", "id": "n"},
+                {"name": "State", "id": "state_po"},
+                {"name": "Party", "id": "party"},
+                {"name": "Change (%)", "id": "change"}
+            ],
+            style_table={'height': '400px', 'overflowY': 'auto'},
+            style_cell={'textAlign': 'left'},
+            style_header={'fontWeight': 'bold'},
+            style_data_conditional=[
+                {'if': {'filter_query': '{party} = "DEM"'}, 'backgroundColor': 'lightblue'},
+                {'if': {'filter_query': '{party} = "REP"'}, 'backgroundColor': 'lightcoral'}
+            ]
+        )
+
+    timer.mark('figure')
+
+    return fig, closest_table, sweeps_table
+
+ # Callback to handle color change on state click and update scoreboard
+
+# County maps: shapes come from /geo/counties.geojson, fetched once by the browser, and
+# hover text is assembled by a hovertemplate from compact customdata
+
+def county_choropleth(fips, z_trace, customdata, hovertemplate, title):
+    map_fig = go.Figure(go.Choropleth(
+        geojson=dash.get_relative_path('/geo/counties.geojson'),
+        locations=fips,
+        customdata=customdata,
+        hovertemplate=hovertemplate,
+        marker_line_width=0,
+        **z_trace
+    ))
+    map_fig.update_layout(
+        title={'text': title, 'x': 0.5, 'xanchor': 'center', 'font': {'size': 24}},
+        geo=dict(scope='usa', showframe=True, framecolor='gold', framewidth=3, bgcolor='white'),
+        margin=dict(l=0, r=0, t=50, b=20), paper_bgcolor='white'
+    )
+    return map_fig
+
+def county_table(records, columns):
+    return dash_table.DataTable(
+        data=records,
+        columns=[{"name": name, "id": column_id} for name, column_id in columns],
+        style_table={'height': '400px', 'overflowY': 'auto'},
+        style_cell={'textAlign': 'left'},
+        style_header={'fontWeight': 'bold'},
+        style_data_conditional=[
+            {'if': {'filter_query': '{party} = "DEM"'}, 'backgroundColor': 'lightblue'},
+            {'if': {'filter_query': '{party} = "REP"'}, 'backgroundColor': 'lightcoral'}
+        ]
+    )
+
+@memoize_outputs(county_results_cache, key=lambda selected_year, color_mode: (int(selected_year), color_mode))
+def render_county_results(selected_year, color_mode):
+    timer = StageTimer()
+    year_results = data['county_cube'][selected_year]
+    counties = year_results['counties']
+    timer.mark('data')
+
+    fig = county_choropleth(
+        counties['county_fips'].astype(str),
+        discrete_color_trace(results_color_labels(year_results, color_mode), results_color_scheme(year_results, color_mode)),
+        year_results['customdata'],
+        county_hovertemplate,
+        title=f"{selected_year} Presidential Results by County"
+    )
+
+    columns = [("#", "n"), ("County", "county"), ("Winner", "party"), ("Margin (%)", "margin")]
+    closest_table = county_table(year_results['closest'], columns)
+    furthest_table = county_table(year_results['furthest'], columns)
+
+    pie_fig = party_pie(year_results, 'county_count', "Counties Won by Party")
+    timer.mark('figure')
+
+    # The scoreboard keeps counting states
+    state_results = data['results_cube'].get(selected_year, {})
+    return (fig, closest_table, furthest_table, pie_fig,
+            state_results.get('dem_count', dash.no_update), state_results.get('rep_count', dash.no_update))
+
+@memoize_outputs(
+    county_evolution_cache,
+    key=lambda start_year, end_year, data_selector, color_mode: (int(start_year), int(end_year), data_selector, color_mode)
+)
+def render_county_evolution(start_year, end_year, data_selector, color_mode):
+    timer = StageTimer()
+    frame = evolution_frame(data['county_engine'], start_year, end_year, data_selector)
+    prefix = 'margin' if data_selector == 'MARGIN' else 'pct'
+    counties = frame['state_po'].map(data['county_names'])
+    customdata = np.array(list(zip(
+        counties, frame[f'{prefix}_start'].round(4), frame[f'{prefix}_end'].round(4), frame['change'].round(4)
+    )), dtype=object)
+    hovertemplate = (
+        '<b>%{customdata[0]}</b><br><br>'
+        f'{start_year}: %{{customdata[1]:.1%}}<br>{end_year}: %{{customdata[2]:.1%}}<br><br>'
+        'Change: <b>%{customdata[3]:+.1%}</b><extra></extra>'
+    )
+    timer.mark('data')
+
+    if data_selector == 'MARGIN':
+        z_trace = discrete_color_trace(margin_color_labels(frame, color_mode), evolution_color_schemes[color_mode])
+        title = f"Margin Change from {start_year} to {end_year}"
+    else:
+        # Diverging scale centered at 0, increases of the selected party in its color
+        limit = change_limit(frame)
+        z_trace = dict(
+            z=frame['change'].round(4), zmin=-limit, zmax=limit,
+            colorscale=[(0, 'blue'), (0.5, 'white'), (1, 'red')] if data_selector == 'REP' else [(0, 'red'), (0.5, 'white'), (1, 'blue')]
+        )
+        title = f"{data_selector} Change from {start_year} to {end_year}"
+    fig = county_choropleth(frame['state_po'], z_trace, customdata, hovertemplate, title)
+
+    tables = []
+    rankings = evolution_rankings(data['county_engine'], data['county_evolution_index'], start_year, end_year, data_selector)
+    for ranking in rankings:
+        tables.append(county_table(
+            evolution_records(ranking, data_selector, location_key='county', names=data['county_names']),
+            [("#", "n"), ("County", "county"), ("Party" if data_selector != 'MARGIN' else "Winner", "party"),
+             ("Change (%)" if data_selector != 'MARGIN' else "Margin Change (%)", "change")]
+        ))
+    timer.mark('figure')
+
+    return fig, tables[0], tables[1]
+
+# Callback Swing
+
+@callback(
+    Output('swing-slider', 'value'),
+    [Input('swing-history', 'value')],
+    prevent_initial_call=True
+)
+
+@timed
+def update_swing_preset(history):
+    # Average state margin change between two elections, snapped to the slider steps
+    if not history:
+        return dash.no_update
+    start_year, end_year = (int(year) for year in history.split('-'))
+    swing = historical_swing(data['margin_engine'], data['electoral_votes'], start_year, end_year)
+    return float(np.clip(round(swing * 2) / 2, swing_grid[0], swing_grid[-1]))
+
+@callback(
+    [Output('us-map-swing', 'figure'), Output('swing-dem-votes', 'children'),
+     Output('swing-rep-votes', 'children'), Output('swing-curve', 'figure'),
+     Output('swing-tipping-point', 'children')],
+    [Input('swing-base-year', 'value'), Input('swing-mode', 'value'), Input('swing-slider', 'value')]
+)
+
+@timed
+def update_swing_map(base_year, mode, swing):
+    return render_swing(base_year, mode, swing)
+
+@memoize_outputs(swing_cache, key=lambda base_year, mode, swing: (int(base_year), mode, float(swing)))
+def render_swing(base_year, mode, swing):
+    engine, electoral_votes = data['margin_engine'], data['electoral_votes']
+
+    # The selected swing and the whole slider range in one pass
+    projection = project(engine, electoral_votes, base_year, np.append(swing_grid, swing), mode)
+    dem_pct = projection['dem_pct'][-1]
+    rep_pct = projection['rep_pct'][-1]
+    winners = np.where(projection['dem_won'][-1], 'DEM', 'REP')
+    margins = 100 * np.abs(dem_pct - rep_pct)
+    hover_text = [
+        f"<b>{state}</b><br><br>DEM: {100*dem:.1f}%<br>REP: {100*rep:.1f}%<br><br><b>+{margin:.1f}% {winner}</b>"
+        for state, dem, rep, margin, winner in zip(projection['states'], dem_pct, rep_pct, margins, winners)
+    ]
+
+    fig = discrete_choropleth(
+        projection['states'], winners, results_color_schemes[0], hover_text,
+        title=f"{base_year} with a {swing:+.1f} point swing"
+    )
+    fig.update_layout(title={'x': 0.5, 'xanchor': 'center'}, margin=dict(l=0, r=0, t=50, b=20))
+
+    # DEM electoral votes over the slider range, the selected swing marked
+    curve = go.Figure(go.Scatter(x=swing_grid, y=projection['dem_ev'][:-1], mode='lines', line_shape='hv', line_color='blue'))
+    curve.add_hline(y=votes_to_win, line_dash='dash', line_color='black')
+    curve.add_vline(x=swing, line_color='gold')
+    curve.update_layout(
+        title="DEM Electoral Votes by Swing", xaxis_title="Swing to DEM (margin points)",
+        yaxis_title="Electoral Votes", paper_bgcolor='white', plot_bgcolor='white'
+    )
+
+    tipping = tipping_point_swing(engine, electoral_votes, base_year, mode)
+    if tipping is None:
+        tipping_text = f"Not enough states reported in {base_year} for {votes_to_win} electoral votes"
+    else:
+        tipping_text = f"DEM reaches {votes_to_win} beyond a {tipping['swing']:+.2f} point swing, tipping point {tipping['state']}"
+
+    return fig, int(projection['dem_ev'][-1]), int(projection['rep_ev'][-1]), curve, tipping_text
+
+# Callback Election
+
+@callback(
+    [Output('winner-logo-2', 'src'), Output('winner-text-2', 'children')],
+    [Input('dem-states-count', 'children'), Input('rep-states-count', 'children')]
+)
+
+@timed
+def update_winner_logo_and_text_2(dem_votes, rep_votes):
+    if int(dem_votes) > 269:
+        return asset_url("dem.png"), "Democratic Party"  # Path to Democratic logo and text
+    elif int(rep_votes) > 269:
+        return asset_url("rep.png"), "Republican Party"  # Path to Republican logo and text
+    else:
+        return asset_url("2024elections.jpg"), "Too Early to Call"
+
+def path_to_270_text(tally):
+    # Remaining tossups and the fewest of them each party needs, mirrored in assets/electionNight.js
+    parts = []
+    for party in ('DEM', 'REP'):
+        needed, path = tally.path_to_270(party)
+        if needed == 0:
+            parts.append(f"{party} has {votes_to_win}")
+        elif path is None:
+            parts.append(f"{party} needs {needed}: no path through the tossups")
+        else:
+            parts.append(f"{party} needs {needed}: {', '.join(path)}")
+    tossups = ', '.join(f"{state} ({tally.votes[state]})" for state in tally.remaining_tossups())
+    parts.append(f"Tossups: {tossups or 'none'}")
+    return ' | '.join(parts)
+
+@timed
+def update_map_and_scoreboard(clickData, rating_store, vote_store):
+    # The store carries the ratings and their running totals, a click only applies one delta
+    tally = ElectoralTally.from_store(rating_store, vote_store)
+
+    map_fig = dash.no_update
+    if clickData:
+        state_clicked = clickData['points'][0]['location']
+
+        # Cycle to the next rating for the clicked state
+        current_rating = tally.ratings[state_clicked]
+        next_code = next_rating(current_rating)
+        tally.set_rating(state_clicked, next_code)
+
+        # Only the clicked state's rating code is sent back
+        map_fig = Patch()
+        map_fig['data'][0]['z'][data['election_night_index'][state_clicked]] = next_code
+
+    return map_fig, tally.totals['DEM'], tally.totals['REP'], path_to_270_text(tally), tally.to_store()
+
+@timed
+def update_scenario_map(clickData, scenario_id):
+    # Server-side scenarios: the browser only keeps the scenario handle
+    scenario_store = data['scenario_store']
+    overrides = scenario_store.get(scenario_id) if scenario_id else None
+    created = overrides is None
+    if created:
+        # No handle yet, or its scenario was evicted: start over from the initial ratings
+        scenario_id = scenario_store.create()
+        overrides = {}
+
+    # Start from the initial totals and apply the scenario's changes as deltas
+    initial_tally = data['initial_tally']
+    tally = ElectoralTally(dict(initial_tally.ratings), initial_tally.votes, dict(initial_tally.totals))
+    for state, code in overrides.items():
+        tally.set_rating(state, code)
+
+    map_fig = Patch()
+    if clickData:
+        state_clicked = clickData['points'][0]['location']
+        next_code = next_rating(tally.ratings[state_clicked])
+        scenario_store.set_rating(scenario_id, state_clicked, next_code)
+        tally.set_rating(state_clicked, next_code)
+
+    if clickData and not created:
+        # Only the clicked state's rating code is sent back
+        map_fig['data'][0]['z'][data['election_night_index'][state_clicked]] = next_code
+    else:
+        # Page load, or a new scenario: the map may still show other ratings, redraw them all
+        map_fig['data'][0]['z'] = [tally.ratings[state] for state in data['election_night_index']]
+
+    return map_fig, tally.totals['DEM'], tally.totals['REP'], path_to_270_text(tally), scenario_id
+
+simulation_inputs = [Input('simulate-button', 'n_clicks')]
+simulation_states = [State('rating-store', 'data'), State('scenario-id', 'data'),
+                     State('simulation-draws', 'value'), State('simulation-correlation', 'value')]
+simulation_outputs = [Output('simulation-histogram', 'figure'), Output('simulation-summary', 'children'),
+                      Output('simulation-tipping', 'children')]
+
+def simulation_ratings(rating_store, scenario_id):
+    # Ratings currently on the map
+    scenario_store = data['scenario_store']
+    if scenario_store is not None:
+        return {**data['initial_tally'].ratings, **(scenario_store.get(scenario_id) or {})}
+    return rating_store['ratings']
+
+def simulation_settings(draws, correlation):
+    # (draws, correlation) of the Simulate panel, None for values the panel cannot send:
+    # draws outside the dropdown, or a correlation that is not a number. The correlation is
+    # clamped to the slider, beyond 1 the state noise would be NaN.
+    try:
+        draws = int(draws)
+        correlation = float(correlation)
+    except (TypeError, ValueError):
+        return None
+    if draws not in simulation_draws or not np.isfinite(correlation):
+        return None
+    return draws, round(float(np.clip(correlation, *simulation_correlation_range)), 2)
+
+@timed
+def update_simulation(n_clicks, rating_store, scenario_id, draws, correlation):
+    settings = simulation_settings(draws, correlation)
+    if settings is None:
+        return dash.no_update, dash.no_update, dash.no_update
+    ratings = simulation_ratings(rating_store, scenario_id)
+    return render_simulation(tuple(sorted(ratings.items())), *settings)
+
+@timed
+def update_simulation_job(n_clicks, n_intervals, rating_store, scenario_id, draws, correlation, job_id):
+    # Same simulation run as a background job: the click submits it, the interval polls its
+    # progress until the result is there. A simulation already run by any worker returns at once.
+    jobs = data['job_queue']
+    if triggered_id() == 'simulate-button':
+        settings = simulation_settings(draws, correlation)
+        if settings is None:
+            return (dash.no_update,) * 3 + ("", None, True)
+        job_id = jobs.submit('electionSimulator:simulation_job', {
+            'ratings': simulation_ratings(rating_store, scenario_id),
+            'votes': data['electoral_votes'],
+            'draws': settings[0],
+            'correlation': settings[1],
+        })
+        if job_id is None:
+            return (dash.no_update,) * 3 + ("Too many simulations waiting, try again shortly", None, True)
+    else:
+        jobs.dispatch()  # Jobs queued while every pool was busy
+    status = jobs.status(job_id) if job_id else None
+    expired = (dash.no_update,) * 3 + ("Simulation expired, simulate again", None, True)
+
+    if status is None:
+        return expired
+    if status['status'] == 'done':
+        # The result may be pruned between the two reads
+        outputs = render_simulation_job(job_id)
+        return expired if outputs is None else tuple(outputs) + ("", None, True)
+    if status['status'] == 'failed':
+        return (dash.no_update,) * 3 + (f"Simulation failed: {status['error']}", None, True)
+    label = "Queued" if status['status'] == 'queued' else f"Simulating... {100 * status['progress']:.0f}%"
+    return (dash.no_update,) * 3 + (label, job_id, False)
+
+@memoize_outputs(simulation_cache, key=lambda job_id: ('job', job_id))
+def render_simulation_job(job_id):
+    # None once the job's result is gone
+    results = data['job_queue'].result(job_id)
+    if results is None:
+        return None
+    results['ev_counts'] = np.array(results['ev_counts'])
+    return simulation_figures(results)
+
+@memoize_outputs(simulation_cache, key=lambda ratings, draws, correlation: (ratings, draws, correlation))
+def render_simulation(ratings, draws, correlation):
+    # The seed stays at its default on purpose: a simulation is then a pure function of the
+    # ratings, draws and correlation, so it can be cached here and shared as a background job,
+    # and clicking Simulate twice gives the same answer (sampling error is about 0.15 points
+    # at 100,000 draws)
+    results = simulate_election(
+        dict(ratings), data['electoral_votes'], draws, correlation, workers=data['simulation_workers']
+    )
+    return simulation_figures(results)
+
+def simulation_figures(results):
+    # Distribution of DEM electoral votes, colored by the winner
+    draws = results['draws']
+    dem_ev = np.arange(len(results['ev_counts']))
+    share = results['ev_counts'] / draws
+    winner = np.where(dem_ev >= votes_to_win, 'DEM', np.where(len(dem_ev) - 1 - dem_ev >= votes_to_win, 'REP', 'Tie'))
+    fig = go.Figure([
+        go.Bar(x=dem_ev[winner == party], y=share[winner == party], name=party, marker_color=color)
+        for party, color in (('DEM', 'blue'), ('REP', 'red'), ('Tie', 'grey'))
+    ])
+    fig.update_layout(
+        title=f"Democratic Electoral Votes in {draws:,} Simulations",
+        xaxis_title="Electoral Votes", yaxis_title="Share of Simulations",
+        bargap=0, paper_bgcolor='white', plot_bgcolor='white'
+    )
+    fig.add_vline(x=votes_to_win, line_dash='dash', line_color='black')
+
+    summary = [
+        html.P(f"DEM wins {100*results['dem_win']:.1f}%"),
+        html.P(f"REP wins {100*results['rep_win']:.1f}%"),
+        html.P(f"Tie {100*results['tie']:.1f}%"),
+        html.P(f"Average DEM electoral votes: {results['mean_dem_ev']:.1f}")
+    ]
+
+    tipping = sorted(results['tipping_point'].items(), key=lambda item: -item[1])[:10]
+    tipping_table = dash_table.DataTable(
+        data=[{'n': i + 1, 'state': state, 'share': round(100 * share, 1)} for i, (state, share) in enumerate(tipping)],
+        columns=[
+            {"name": "#", "id": "n"},
+            {"name": "State", "id": "state"},
+            {"name": "Tipping Point (%)", "id": "share"}
+        ],
+        style_cell={'textAlign': 'left'},
+        style_header={'fontWeight': 'bold'}
+    )
+
+    return fig, summary, tipping_table
+
+election_night_outputs = [
+    Output('us-map-election-night', 'figure'),
+    Output('dem-electoral-votes', 'children'),
+    Output('rep-electoral-votes', 'children'),
+    Output('path-to-270', 'children')
+]
@@ -0,0 +1,160 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from threading import Lock
+
+from flask import Response, abort, request
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # Optional, only JSON is served without it
+    pyarrow = None
+
+# Read-only bulk data routes, built from the in-memory results without any figure:
+#   /api/results          every election: states and electoral votes won by each party
+#   /api/results/<year>   winner, runner-up and margin of every state
+# Add ?format=arrow (or send Accept: application/vnd.apache.arrow.stream) for Arrow IPC.
+# Encoded payloads are kept until live results change the data, and revalidated with
+# ETag / Last-Modified. Compression is left to httpCaching.py, which compresses each of
+# them once thanks to the ETag.
+
+json_mimetype = 'application/json'
+arrow_mimetype = 'application/vnd.apache.arrow.stream'
+
+data = {}  # Set by init_app()
+payloads = {}
+payloads_lock = Lock()
+last_modified = None  # When the data last changed: the source files, then every live batch
+version = 0
+
+
+def invalidate():
+    # Called after every live results batch
+    global last_modified, version
+    with payloads_lock:
+        payloads.clear()
+        last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        version += 1
+
+
+def party_votes(states, electoral_votes):
+    # Electoral votes won by DEM, REP and the other parties, current apportionment
+    totals = {'DEM': 0, 'REP': 0, 'Other': 0}
+    for state, party in zip(states['state_po'].astype(str), states['party'].astype(str)):
+        totals[party if party in totals else 'Other'] += electoral_votes.get(state, 0)
+    return totals
+
+
+def year_table(year):
+    states = data['results_cube'][year]['states']
+    electoral_votes = data['electoral_votes']
+    table = states[['state_po', 'state', 'party', 'pct', 'second_party', 'second_pct', 'margin']].rename(
+        columns={'party': 'winner', 'second_party': 'runner_up', 'second_pct': 'runner_up_pct'}
+    ).astype({'state_po': str, 'state': str, 'winner': str})
+    table['pct'] = table['pct'].round(4)
+    table['runner_up_pct'] = table['runner_up_pct'].round(4)
+    table['electoral_votes'] = table['state_po'].map(electoral_votes).fillna(0).astype(int)
+    return table.reset_index(drop=True), party_votes(states, electoral_votes)
+
+
+def summary_rows():
+    rows = []
+    for year, year_results in sorted(data['results_cube'].items()):
+        votes = party_votes(year_results['states'], data['electoral_votes'])
+        rows.append({
+            'year': year,
+            'dem_states': year_results['dem_count'],
+            'rep_states': year_results['rep_count'],
+            'other_states': year_results.get('other_count', 0),
+            'dem_electoral_votes': votes['DEM'],
+            'rep_electoral_votes': votes['REP'],
+            'other_electoral_votes': votes['Other'],
+        })
+    return rows
+
+
+def arrow_payload(columns, metadata):
+    table = pyarrow.table(columns).replace_schema_metadata({key: json.dumps(value) for key, value in metadata.items()})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_year(year, fmt):
+    table, votes = year_table(year)
+    if fmt == 'arrow':
+        return arrow_payload({column: table[column].tolist() for column in table}, {'year': year, 'electoral_votes': votes})
+    return json.dumps({'year': year, 'electoral_votes': votes, 'states': table.to_dict('records')}, separators=(',', ':'))
+
+
+def encode_summary(fmt):
+    rows = summary_rows()
+    if fmt == 'arrow':
+        return arrow_payload({column: [row[column] for row in rows] for column in rows[0]}, {})
+    return json.dumps({'years': rows}, separators=(',', ':'))
+
+
+def requested_format():
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = 'arrow' if request.accept_mimetypes.best_match([json_mimetype, arrow_mimetype]) == arrow_mimetype else 'json'
+    if fmt not in ('json', 'arrow'):
+        abort(400)
+    if fmt == 'arrow' and pyarrow is None:
+        abort(406, description="Arrow responses need pyarrow installed on the server")
+    return fmt
+
+
+def cached_payload(key, encode):
+    # Encoded body and its ETag, built once per data version
+    with payloads_lock:
+        entry = payloads.get(key)
+        encoded_version = version
+    if entry is None:
+        body = encode()
+        body = body.encode('utf-8') if isinstance(body, str) else body
+        entry = {'body': body, 'etag': hashlib.sha256(body).hexdigest()[:32]}
+        with payloads_lock:
+            # Not kept when a live batch landed while encoding
+            if version == encoded_version:
+                payloads[key] = entry
+    return entry
+
+
+def respond(key, encode, fmt):
+    entry = cached_payload(key, encode)
+    # Weak comparison, compressed responses carry the ETag as W/"..."
+    if request.if_none_match.contains_weak(entry['etag']) or (
+        not request.if_none_match and request.if_modified_since and request.if_modified_since >= last_modified
+    ):
+        response = Response(status=304)
+    else:
+        response = Response(entry['body'], mimetype=arrow_mimetype if fmt == 'arrow' else json_mimetype)
+    response.set_etag(entry['etag'])
+    response.last_modified = last_modified
+    response.vary.add('Accept')
+    # Live results can change the data at any time, clients revalidate every request
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def init_app(server, dataset):
+    # dataset is the dashboard's data dict itself, so live results are seen as they land
+    global data, last_modified
+    data = dataset
+    last_modified = datetime.fromtimestamp(dataset['data_modified'], timezone.utc).replace(microsecond=0)
+
+    @server.route('/api/results')
+    def results_summary():
+        fmt = requested_format()
+        return respond(('summary', fmt), lambda: encode_summary(fmt), fmt)
+
+    @server.route('/api/results/<int:year>')
+    def results_year(year):
+        if year not in data['results_cube']:
+            abort(404)
+        fmt = requested_format()
+        return respond((year, fmt), lambda: encode_year(year, fmt), fmt)
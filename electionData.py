@@ -0,0 +1,514 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+# Color buckets used by the "Change Color" mode of the Results tab
+margin_bucket_colors = {
+    'DEM Lean': '#a6cee3', 'DEM Likely': '#1f78b4', 'DEM Solid': '#08306b',
+    'REP Lean': '#fb9a99', 'REP Likely': '#e31a1c', 'REP Solid': '#67000d',
+    'DEM': 'blue', 'REP': 'red', 'Other': '#9e9e9e'
+}
+
+
+def margin_labels(party, margin):
+    # Lean (<= 5 points), Likely (<= 15) or Solid bucket of every winner, '' for third parties
+    party = np.asarray(party, dtype=str)
+    strength = np.select([margin <= 5, margin <= 15], ['Lean', 'Likely'], 'Solid')
+    return np.where(np.isin(party, ['DEM', 'REP']), np.char.add(np.char.add(party, ' '), strength), '')
+
+
+def percent_text(values, signed=False):
+    # '40.9%' strings for whole columns of values already in percent
+    return np.char.mod('%+.1f%%' if signed else '%.1f%%', np.asarray(values, dtype=float))
+
+
+def hover_text(names, first, second, footer):
+    # Map hover boxes, '<b>name</b>', two lines and a footer, built column-wise instead of per row
+    parts = [np.asarray(names, dtype=str), '</b><br><br>', first, '<br>', second, '<br><br>', footer]
+    text = np.asarray('<b>', dtype=str)
+    for part in parts:
+        text = np.char.add(text, part)
+    return text
+
+
+def data_fingerprint(*paths):
+    # Hash of the source data files, used to detect stale derived artifacts
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+# Columns kept as pandas categoricals in memory and as integer codes in the data bundle
+categorical_columns = {
+    'results': ['state', 'state_po', 'candidate', 'party'],
+    'electoral': ['state', 'state_po'],
+}
+
+
+# Compact dtypes of the results table; pct stays exact enough at float32 (3 decimals in the CSV)
+compact_dtypes = {
+    'id': np.int32, 'year': np.int16, 'pct': np.float32, 'margin': np.float32,
+    'candidatevotes': np.int32, 'totalvotes': np.int32,
+}
+
+
+def compact_results(df):
+    # Year-sorted results with small integer/float columns, so that every year is a
+    # contiguous block of rows (see year_offsets). Idempotent, bundles written before
+    # the compact layout are converted on load.
+    df = df.sort_values('year', kind='stable').reset_index(drop=True)
+    return df.astype({column: dtype for column, dtype in compact_dtypes.items() if column in df})
+
+
+def widen_pct(values):
+    # float32 shares back to float64 for derived tables, rounded to the 6 decimals that
+    # float32 holds exactly so 0.409 stays 0.409 and not 0.4090000092983246
+    return np.round(np.asarray(values, dtype=np.float64), 6)
+
+
+def year_offsets(df):
+    # {year: slice of its rows} of a year-sorted table, df.iloc[offsets[year]] is a view
+    years = df['year'].to_numpy()
+    unique, starts = np.unique(years, return_index=True)
+    stops = np.append(starts[1:], len(years))
+    return {int(year): slice(int(start), int(stop)) for year, start, stop in zip(unique, starts, stops)}
+
+
+def read_results_csv(csv_path):
+    df = pd.read_csv(csv_path)
+    df['year'] = df['year'].astype(int)
+    df['pct'] = df['pct'].astype(float)
+    df['state'] = df['state'].str.title()
+    # Write-ins and independents without a party label are kept as OTHER
+    df['party'] = df['party'].fillna('OTHER')
+    for column in categorical_columns['results']:
+        df[column] = df[column].astype('category')
+    return df
+
+
+def read_electoral_excel(excel_path):
+    electoral_df = pd.read_excel(excel_path)
+    for column in categorical_columns['electoral']:
+        electoral_df[column] = electoral_df[column].astype('category')
+    return electoral_df
+
+
+def write_data_bundle(path, fingerprint, frames):
+    # Uncompressed .npz with one typed array per column, categoricals stored as codes
+    arrays = {'fingerprint': np.array(fingerprint), 'frames': np.array(list(frames), dtype=str)}
+    for name, frame in frames.items():
+        arrays[f'{name}/columns'] = np.array(frame.columns, dtype=str)
+        for column in frame.columns:
+            values = frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                arrays[f'{name}/{column}/codes'] = values.cat.codes.to_numpy()
+                arrays[f'{name}/{column}/categories'] = values.cat.categories.to_numpy(dtype=str)
+            elif values.dtype.kind in 'biuf':
+                arrays[f'{name}/{column}'] = values.to_numpy()
+            else:
+                arrays[f'{name}/{column}'] = values.to_numpy(dtype=str)
+
+    tmp_path = f'{path}.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def read_data_bundle(path, fingerprint):
+    # None when the bundle is missing, unreadable or built from other source files
+    try:
+        bundle = np.load(path, allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+    with bundle:
+        if 'fingerprint' not in bundle.files or str(bundle['fingerprint']) != fingerprint:
+            return None
+
+        frames = {}
+        for name in bundle['frames']:
+            frame = {}
+            for column in bundle[f'{name}/columns'].tolist():
+                if f'{name}/{column}/codes' in bundle.files:
+                    frame[column] = pd.Categorical.from_codes(
+                        bundle[f'{name}/{column}/codes'], bundle[f'{name}/{column}/categories']
+                    )
+                else:
+                    frame[column] = bundle[f'{name}/{column}']
+            frames[str(name)] = pd.DataFrame(frame)
+        return frames
+
+
+def load_datasets(csv_path, excel_path, bundle_path, fingerprint):
+    # Load the binary bundle, and rebuild it from the CSV/XLSX sources when stale
+    frames = read_data_bundle(bundle_path, fingerprint)
+    if frames is None:
+        frames = {'results': compact_results(read_results_csv(csv_path)), 'electoral': read_electoral_excel(excel_path)}
+        try:
+            write_data_bundle(bundle_path, fingerprint, frames)
+        except OSError:
+            pass  # Read-only deployments keep parsing the sources on every start
+    return compact_results(frames['results']), frames['electoral']
+
+
+def load_election_data(csv_path, excel_path, bundle_path):
+    # Datasets plus every table derived from them at startup
+    fingerprint = data_fingerprint(csv_path, excel_path)
+    df, electoral_df = load_datasets(csv_path, excel_path, bundle_path, fingerprint)
+    margin_engine = build_margin_engine(df)
+    return {
+        'fingerprint': fingerprint,
+        # Last change of the source files, the Last-Modified of the data API until live results arrive
+        'data_modified': max(os.path.getmtime(path) for path in (csv_path, excel_path)),
+        'df': df,
+        'electoral_df': electoral_df,
+        # Rows of every year, the table is year-sorted
+        'year_offsets': year_offsets(df),
+        # Winners, margins, color buckets and hover text for every year
+        'results_cube': build_results_cube(df),
+        # State x year x party matrix used by the Evolution tab
+        'margin_engine': margin_engine,
+        # Top and bottom changes of every year pair for the Evolution tables
+        'evolution_index': build_evolution_index(margin_engine),
+    }
+
+
+def rank_leaders(df, location='state_po', name='state'):
+    # Rank every candidate inside its (year, location) with a single sort: the rank is the
+    # position in the sorted rows minus the position where the group starts. Works for any
+    # number of candidates, third parties and write-ins included. Locations are states, or
+    # counties with countyData; hover text is built from the `name` column, None skips it.
+    ranked = df.assign(pct=widen_pct(df['pct'])).sort_values(['year', location, 'pct'], ascending=[True, True, False])
+    years = ranked['year'].to_numpy()
+    states = ranked[location].cat.codes.to_numpy() if isinstance(ranked[location].dtype, pd.CategoricalDtype) \
+        else pd.factorize(ranked[location])[0]
+    position = np.arange(len(ranked))
+    group_start = np.ones(len(ranked), dtype=bool)
+    group_start[1:] = (years[1:] != years[:-1]) | (states[1:] != states[:-1])
+    rank = position - np.maximum.accumulate(np.where(group_start, position, 0))
+
+    leading_party = ranked[rank == 0].set_index(['year', location])
+    runner_up = ranked[rank == 1].set_index(['year', location]).reindex(leading_party.index)
+
+    # Locations with a single candidate have no runner-up
+    leading_party['second_pct'] = runner_up['pct'].fillna(0.0)
+    leading_party['second_party'] = runner_up['party'].astype(object).fillna('').to_numpy()
+    leading_party['margin'] = ((leading_party['pct'] - leading_party['second_pct']).abs() * 100).round(2)
+    leading_party = leading_party.reset_index()
+
+    # Define 6-color scheme based on margin levels
+    party = leading_party['party'].to_numpy(dtype=str)
+    margin = leading_party['margin'].to_numpy()
+    leading_party['margin_label'] = margin_labels(party, margin)
+    if name is None:
+        return leading_party
+
+    # Create custom hover text, winner first
+    second_party = leading_party['second_party'].to_numpy(dtype=str)
+    second_party = np.where(second_party == '', 'Runner-up', second_party)
+    leading_party['hover_text'] = hover_text(
+        leading_party[name],
+        np.char.add(np.char.add(party, ': '), percent_text(100 * leading_party['pct'].to_numpy())),
+        np.char.add(np.char.add(second_party, ': '), percent_text(100 * leading_party['second_pct'].to_numpy())),
+        np.char.add(np.char.add(np.char.add('<b>+', percent_text(margin)), ' '), np.char.add(party, '</b>')),
+    ).astype(object)
+    return leading_party
+
+
+def summarize_year(year_df):
+    # Entry of the results cube for one election year, ready to be served by the Results callback
+    year_df = year_df.reset_index(drop=True)
+
+    closest_races = year_df[['state', 'party', 'margin']].nsmallest(10, 'margin').reset_index(drop=True)
+    closest_races['n'] = closest_races.index + 1  # Start numbering from 1
+
+    furthest_races = year_df[['state', 'party', 'margin']].nlargest(10, 'margin').reset_index(drop=True)
+    furthest_races['n'] = furthest_races.index + 1  # Start numbering from 1
+
+    return {
+        'states': year_df,
+        'closest': closest_races.to_dict('records'),
+        'furthest': furthest_races.to_dict('records'),
+        'dem_count': int((year_df['party'] == 'DEM').sum()),
+        'rep_count': int((year_df['party'] == 'REP').sum()),
+        # States carried by third parties, e.g. Wallace in 1968
+        'other_count': int((~year_df['party'].isin(['DEM', 'REP'])).sum()),
+    }
+
+
+def build_results_cube(df):
+    # One entry per election year
+    leading_party = rank_leaders(df)
+    return {int(year): summarize_year(year_df) for year, year_df in leading_party.groupby('year', observed=True)}
+
+
+def build_margin_engine(df, location='state_po', name='state'):
+    # Pivot the results into a dense location (state, or county with countyData) x year x party
+    # matrix of vote shares. With a name column, party changes tie in name order (see rank_changes).
+    states = pd.Index(sorted(df[location].unique()))
+    years = sorted(int(year) for year in df['year'].unique())
+    parties = sorted(df['party'].unique())
+
+    columns = pd.MultiIndex.from_product([years, parties], names=['year', 'party'])
+    # Candidates sharing a party label (several OTHER write-ins) add up
+    pct = widen_pct(
+        df.groupby([location, 'year', 'party'], observed=True)['pct'].sum()
+        .unstack(['year', 'party'])
+        .reindex(index=states, columns=columns)
+        .to_numpy()
+    ).reshape(len(states), len(years), len(parties))
+
+    party_index = {party: i for i, party in enumerate(parties)}
+    names = df.drop_duplicates(location).set_index(location)[name] if name else None
+    return {
+        'states': states,
+        # Location positions sorted by name, None without a name column
+        'name_order': np.argsort(names.reindex(states).astype(str).to_numpy(), kind='stable') if name else None,
+        'year_index': {year: i for i, year in enumerate(years)},
+        'party_index': party_index,
+        'pct': pct,
+        'margin': location_margins(pct, party_index),
+    }
+
+
+def location_margins(pct, party_index):
+    # REP minus DEM margin of every cell of a (..., party) share array: 0 when one of the two
+    # parties is missing from a reported location, NaN when the location has no result that
+    # year (e.g. states not reported yet on election night), so Evolution views skip it
+    reported = ~np.isnan(pct).all(axis=-1)
+    if 'REP' in party_index and 'DEM' in party_index:
+        margin = np.nan_to_num(pct[..., party_index['REP']] - pct[..., party_index['DEM']])
+    else:
+        margin = np.zeros(pct.shape[:-1])
+    return np.where(reported, margin, np.nan)
+
+
+def selector_values(engine, data_selector):
+    # State x year matrix shown by the Evolution tab for 'MARGIN' or a party
+    if data_selector == 'MARGIN':
+        return engine['margin']
+    return engine['pct'][:, :, engine['party_index'][data_selector]]
+
+
+def evolution_frame(engine, start_year, end_year, data_selector):
+    start = engine['year_index'][start_year]
+    end = engine['year_index'][end_year]
+
+    # Margin change is one column subtraction over every state at once
+    values = selector_values(engine, data_selector)
+    prefix = 'margin' if data_selector == 'MARGIN' else 'pct'
+
+    frame = pd.DataFrame({
+        'state_po': engine['states'],
+        f'{prefix}_start': values[:, start],
+        f'{prefix}_end': values[:, end],
+    })
+    frame['change'] = frame[f'{prefix}_end'] - frame[f'{prefix}_start']
+
+    # Keep only states reported in both years
+    return frame.dropna().reset_index(drop=True)
+
+
+# Rows of the Evolution tables
+evolution_table_size = 10
+
+
+def rank_changes(values, starts, ends, top, tie_order=None):
+    # Positions of the `top` smallest and largest changes between every start and end year
+    # position, shape (starts, ends, top). Stable sorts keep ties in location order, or in
+    # tie_order (location positions) when given, like nsmallest/nlargest on a table in that
+    # order; -1 pads pairs with fewer than `top` reported states.
+    if tie_order is None:
+        tie_order = np.arange(len(values))
+    change = np.moveaxis(values[tie_order][:, None, ends] - values[tie_order][:, starts, None], 0, -1)
+    rankings = []
+    for order in (np.argsort(change, axis=-1, kind='stable'), np.argsort(-change, axis=-1, kind='stable')):
+        order = order[..., :top]
+        missing = np.isnan(np.take_along_axis(change, order, axis=-1))
+        ranked = np.full(order.shape[:-1] + (top,), -1, dtype=np.int32)
+        ranked[..., :order.shape[-1]] = np.where(missing, -1, tie_order[order])
+        rankings.append(ranked)
+    return rankings
+
+
+def selector_tie_order(engine, data_selector):
+    # The Evolution tables used to rank the margin by state_po (a groupby) but a party in the
+    # results table's order, by state name
+    return None if data_selector == 'MARGIN' else engine.get('name_order')
+
+
+def build_evolution_index(engine, top=evolution_table_size):
+    # Smallest and largest changes of every (start, end) year pair, for the margin and
+    # every party, so the Evolution tables never sort at request time
+    years = np.arange(len(engine['year_index']))
+    index = {'years': list(engine['year_index']), 'states': engine['states'], 'top': top, 'rankings': {}}
+    for data_selector in ['MARGIN', *engine['party_index']]:
+        smallest, largest = rank_changes(
+            selector_values(engine, data_selector), years, years, top, selector_tie_order(engine, data_selector)
+        )
+        index['rankings'][data_selector] = {'smallest': smallest, 'largest': largest}
+    return index
+
+
+def refresh_evolution_index(index, engine, changed_years):
+    # Rerank only the pairs that involve a changed year. Years appended after the last
+    # indexed one extend the index; any other change of the grid rebuilds it.
+    years = list(engine['year_index'])
+    same_grid = (
+        years[:len(index['years'])] == index['years']
+        and index['states'].equals(engine['states'])
+        and set(index['rankings']) == {'MARGIN', *engine['party_index']}
+    )
+    if not same_grid:
+        return build_evolution_index(engine, index['top'])
+
+    changed = sorted({engine['year_index'][year] for year in changed_years} | set(range(len(index['years']), len(years))))
+    if not changed:
+        return index
+    # A new index, the one passed in may still be read
+    index = {**index, 'rankings': {data_selector: dict(rankings) for data_selector, rankings in index['rankings'].items()}}
+    all_years = np.arange(len(years))
+    for data_selector, rankings in index['rankings'].items():
+        values = selector_values(engine, data_selector)
+        tie_order = selector_tie_order(engine, data_selector)
+        for which, rows in zip(('smallest', 'largest'), rank_changes(values, changed, all_years, index['top'], tie_order)):
+            grown = np.full((len(years), len(years), index['top']), -1, dtype=np.int32)
+            grown[:len(index['years']), :len(index['years'])] = rankings[which]
+            grown[changed] = rows
+            rankings[which] = grown
+        for which, columns in zip(('smallest', 'largest'), rank_changes(values, all_years, changed, index['top'], tie_order)):
+            rankings[which][:, changed] = columns
+    index['years'] = years
+    return index
+
+
+def evolution_rankings(engine, index, start_year, end_year, data_selector):
+    # (locations, changes in points) of the smallest and of the largest changes, read from the index
+    start = engine['year_index'][start_year]
+    end = engine['year_index'][end_year]
+    values = selector_values(engine, data_selector)
+    rankings = []
+    for which in ('smallest', 'largest'):
+        positions = index['rankings'][data_selector][which][start, end]
+        positions = positions[positions >= 0]
+        changes = np.round((values[positions, end] - values[positions, start]) * 100, 2)
+        rankings.append((engine['states'][positions], changes))
+    return rankings
+
+
+# Fields of a live results update, one JSON object per line of the feed (see liveResults.py).
+# An optional 'candidate' tells apart several candidates of one party in a state (OTHER write-ins).
+live_result_fields = ('year', 'state_po', 'party', 'candidatevotes', 'totalvotes')
+
+
+def state_rows(df, offsets, year, state):
+    # Positions of the rows of one state in one year, looked up inside the year's block only
+    if year not in offsets:
+        return np.array([], dtype=int)
+    block = offsets[year]
+    return block.start + np.flatnonzero((df['state_po'].iloc[block] == state).to_numpy())
+
+
+def apply_live_results(dataset, records):
+    # Apply a batch of live updates to the results table, then recompute the derived
+    # tables only for the reported states. An update sets a candidate's votes and the
+    # state's total; the shares of every candidate of the state are recomputed from the
+    # latest total of the batch. Returns {year: reported states}.
+    # Everything is built on copies and swapped into the dataset at the end, in a single
+    # dict.update: a batch that fails leaves the dataset as it was, and readers see either
+    # the old tables or the new ones, never a mix.
+    updates = pd.DataFrame.from_records(records)
+    updates['year'] = updates['year'].astype(int)
+    updates['candidate'] = updates['candidate'].fillna('').astype(str) if 'candidate' in updates else ''
+    totals = updates.groupby(['year', 'state_po'])['totalvotes'].last()
+    updates = updates.drop_duplicates(['year', 'state_po', 'party', 'candidate'], keep='last').reset_index(drop=True)
+
+    # Match the updates with the rows of their state: same party, and same candidate when named
+    df = dataset['df'].copy()
+    offsets = dataset['year_offsets']
+    positions = np.full(len(updates), -1)
+    for (year, state), group in updates.groupby(['year', 'state_po']):
+        rows = state_rows(df, offsets, year, state)
+        parties = df['party'].iloc[rows].to_numpy(dtype=str)
+        candidates = df['candidate'].iloc[rows].to_numpy(dtype=str)
+        for i, party, candidate in zip(group.index, group['party'], group['candidate']):
+            match = (parties == party) & ((candidates == candidate) if candidate else True)
+            if match.any():
+                positions[i] = rows[np.argmax(match)]
+
+    # Rows already in the table are updated in place
+    known = positions >= 0
+    df.iloc[positions[known], df.columns.get_loc('candidatevotes')] = (
+        updates.loc[known, 'candidatevotes'].to_numpy(dtype=df['candidatevotes'].dtype)
+    )
+
+    # New candidates, states or years are appended
+    if not known.all():
+        state_names = df[['state_po', 'state']].drop_duplicates('state_po').astype(str)
+        added = updates[~known].copy()
+        added['state'] = added['state_po'].map(dict(zip(state_names['state_po'], state_names['state']))).fillna(added['state_po'])
+        added['pct'] = 0.0
+        if 'id' in df:
+            added['id'] = np.arange(len(added)) + int(df['id'].max()) + 1
+        df = pd.concat([df, added[[column for column in df.columns if column in added]]], ignore_index=True)
+        for column in categorical_columns['results']:
+            df[column] = df[column].astype(str).astype('category')
+        df = compact_results(df)
+        offsets = year_offsets(df)
+
+    # Total and shares of every candidate of the reported states
+    touched = {key: state_rows(df, offsets, *key) for key in totals.index}
+    for (year, state), rows in touched.items():
+        total = totals[(year, state)]
+        votes = df['candidatevotes'].iloc[rows].to_numpy(dtype=np.float64)
+        df.iloc[rows, df.columns.get_loc('totalvotes')] = np.full(len(rows), total, dtype=df['totalvotes'].dtype)
+        df.iloc[rows, df.columns.get_loc('pct')] = (votes / total if total > 0 else np.zeros(len(rows))).astype(df['pct'].dtype)
+
+    reported = updates.groupby('year')['state_po'].agg(lambda states: set(states)).to_dict()
+
+    # Results cube: rerank the reported states and rebuild the summaries of their years
+    cube = dict(dataset['results_cube'])
+    for year, states in reported.items():
+        year_df = df.iloc[offsets[year]]
+        fresh = rank_leaders(year_df[year_df['state_po'].isin(states)])
+        if year in cube:
+            kept = cube[year]['states']
+            fresh = pd.concat([kept[~kept['state_po'].isin(states)], fresh], ignore_index=True)
+        cube[year] = summarize_year(fresh.sort_values('state_po'))
+
+    # Margin engine: rebuild the cells of the reported states, or the whole engine when the grid grows
+    engine = dataset['margin_engine']
+    state_index = {state: i for i, state in enumerate(engine['states'])}
+    in_grid = (
+        all(state in state_index and year in engine['year_index'] for year, state in touched)
+        and updates['party'].isin(engine['party_index']).all()
+    )
+    if in_grid:
+        engine = {**engine, 'pct': engine['pct'].copy(), 'margin': engine['margin'].copy()}
+        shares = (
+            df.iloc[np.concatenate(list(touched.values()))]
+            .groupby(['state_po', 'year', 'party'], observed=True)['pct'].sum()
+        )
+        s = np.array([state_index[state] for _, state in touched])
+        y = np.array([engine['year_index'][year] for year, _ in touched])
+        engine['pct'][s, y] = np.nan
+        engine['pct'][
+            shares.index.get_level_values('state_po').map(state_index).to_numpy(),
+            shares.index.get_level_values('year').map(engine['year_index']).to_numpy(),
+            shares.index.get_level_values('party').map(engine['party_index']).to_numpy(),
+        ] = widen_pct(shares.to_numpy())
+        engine['margin'][s, y] = location_margins(engine['pct'][s, y], engine['party_index'])
+    else:
+        engine = build_margin_engine(df)
+
+    dataset.update({
+        'df': df,
+        'year_offsets': offsets,
+        'results_cube': cube,
+        'margin_engine': engine,
+        'evolution_index': refresh_evolution_index(dataset['evolution_index'], engine, reported),
+    })
+    return reported
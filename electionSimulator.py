@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from statistics import NormalDist
+from threading import Lock
+
+import numpy as np
+
+from electoralTally import rating_labels, votes_to_win
+
+# Monte Carlo elections from the Election Night ratings. Every state is won by the DEM
+# candidate when its latent draw falls below the normal quantile of the rating's win
+# probability; the draw mixes a national swing shared by every state of a simulated
+# election with independent state noise, so each state keeps its win probability
+# while the states move together.
+
+# DEM win probability of each rating code
+rating_win_probability = dict(zip(range(len(rating_labels)), [0.99, 0.90, 0.70, 0.50, 0.30, 0.10, 0.01]))
+
+batch_size = 65536  # Simulated elections per NumPy batch, about 13 MB per array for 51 states
+
+# Worker processes kept between simulations, starting them costs about as much as a simulation
+_pool = None
+_pool_key = None  # (pid, size) the pool was started for
+_pool_lock = Lock()
+
+
+def simulation_pool(workers):
+    # Per process pool of at most one process per core. Processes start from a clean
+    # interpreter (forkserver) rather than a fork of a threaded web worker.
+    global _pool, _pool_key
+    key = (os.getpid(), max(1, min(workers, os.cpu_count() or 1)))
+    with _pool_lock:
+        if _pool_key != key:
+            context = multiprocessing.get_context(
+                'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            )
+            if _pool is not None and _pool_key[0] == key[0]:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=key[1], mp_context=context)
+            _pool_key = key
+        return _pool
+
+
+def simulate_batches(thresholds, votes, draws, correlation, seed, progress=None):
+    # DEM electoral vote distribution and tipping point counts of `draws` simulated elections,
+    # progress(fraction) is called after every batch
+    rng = np.random.default_rng(seed)
+    total_votes = int(votes.sum())
+    ev_counts = np.zeros(total_votes + 1, dtype=np.int64)
+    tipping_counts = np.zeros(len(votes), dtype=np.int64)
+    state_weight = np.float32(np.sqrt(1 - correlation ** 2))
+
+    remaining = draws
+    while remaining > 0:
+        n = min(batch_size, remaining)
+        remaining -= n
+
+        latent = rng.standard_normal((n, len(votes)), dtype=np.float32)
+        latent *= state_weight
+        latent += np.float32(correlation) * rng.standard_normal((n, 1), dtype=np.float32)
+
+        # Positive margin: the state goes DEM
+        margin = thresholds - latent
+        dem_ev = (margin > 0).astype(np.float32) @ votes
+        dem_ev = np.rint(dem_ev).astype(np.int64)
+        ev_counts += np.bincount(dem_ev, minlength=total_votes + 1)
+
+        # Tipping point: order the states from the winner's safest to its weakest and
+        # find the one that takes the winner to 270; ties have none
+        dem_won = dem_ev >= votes_to_win
+        decided = dem_won | (total_votes - dem_ev >= votes_to_win)
+        margin[dem_won] *= -1
+        order = np.argsort(margin[decided], axis=1)
+        cumulative = np.cumsum(votes[order], axis=1)
+        tipping = order[np.arange(len(order)), np.argmax(cumulative >= votes_to_win, axis=1)]
+        tipping_counts += np.bincount(tipping, minlength=len(votes))
+        if progress is not None:
+            progress(1 - remaining / draws)
+
+    return ev_counts, tipping_counts
+
+
+def simulate_election(ratings, votes, draws=100000, correlation=0.5, seed=0, workers=1, progress=None):
+    # ratings and votes: {state: rating code}, {state: electoral votes}; progress is only
+    # reported by a single worker. The draws are split in `workers` independent streams and
+    # run on the shared pool, so the result only depends on seed and workers, not on the cores.
+    states = sorted(ratings)
+    thresholds = np.array(
+        [NormalDist().inv_cdf(rating_win_probability[ratings[state]]) for state in states], dtype=np.float32
+    )
+    vote_array = np.array([votes[state] for state in states], dtype=np.float32)
+
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [draws // workers + (i < draws % workers) for i in range(workers)]
+    jobs = [(thresholds, vote_array, share, correlation, worker_seed) for share, worker_seed in zip(shares, seeds)]
+    if workers > 1:
+        try:
+            results = list(simulation_pool(workers).map(simulate_batches, *zip(*jobs)))
+        except BrokenProcessPool:
+            # A pool process died, the next simulation starts a new pool
+            global _pool_key
+            with _pool_lock:
+                _pool_key = None
+            raise
+    else:
+        results = [simulate_batches(*job, progress=progress) for job in jobs]
+
+    ev_counts = sum(result[0] for result in results)
+    tipping_counts = sum(result[1] for result in results)
+
+    dem_ev = np.arange(len(ev_counts))
+    total_votes = len(ev_counts) - 1
+    return {
+        'draws': draws,
+        'ev_counts': ev_counts,
+        'dem_win': float(ev_counts[votes_to_win:].sum() / draws),
+        'rep_win': float(ev_counts[:total_votes - votes_to_win + 1].sum() / draws),
+        'tie': float(ev_counts[total_votes - votes_to_win + 1:votes_to_win].sum() / draws),
+        'mean_dem_ev': float((dem_ev * ev_counts).sum() / draws),
+        'tipping_point': {
+            state: float(count / draws) for state, count in zip(states, tipping_counts) if count
+        },
+    }
+
+
+def simulation_job(progress, ratings, votes, draws, correlation):
+    # Background job version (see backgroundJobs.py), with a JSON result. The job pool
+    # already spreads simulations over the cores, so each one runs in a single process.
+    results = simulate_election(ratings, votes, draws, correlation, progress=progress)
+    results['ev_counts'] = results['ev_counts'].tolist()
+    return results
@@ -0,0 +1,70 @@
+# Election Night ratings are small integer codes, the position of their color in
+# dashboard.color_cycle: 0-2 DEM Solid/Likely/Lean, 3 Tossup, 4-6 REP Lean/Likely/Solid
+rating_labels = ['DEM-Solid', 'DEM-Likely', 'DEM-Lean', 'Tossup', 'REP-Lean', 'REP-Likely', 'REP-Solid']
+rating_codes = {label: code for code, label in enumerate(rating_labels)}
+tossup = rating_codes['Tossup']
+
+votes_to_win = 270
+
+
+def rating_side(code):
+    if code < tossup:
+        return 'DEM'
+    return 'Tossup' if code == tossup else 'REP'
+
+
+def next_rating(code):
+    # A clicked state moves: DEM -> Tossup -> REP -> DEM Lean
+    if code < tossup:
+        return tossup
+    if code == tossup:
+        return tossup + 1
+    return tossup - 1
+
+
+class ElectoralTally:
+    # DEM, REP and Tossup electoral vote totals, updated by the delta of each rating change
+
+    def __init__(self, ratings, votes, totals=None):
+        self.ratings = ratings
+        self.votes = votes
+        if totals is None:
+            totals = {'DEM': 0, 'REP': 0, 'Tossup': 0}
+            for state, code in ratings.items():
+                totals[rating_side(code)] += votes[state]
+        self.totals = totals
+        self.tossups = {state for state, code in ratings.items() if code == tossup}
+
+    @classmethod
+    def from_store(cls, store, votes):
+        # dcc.Store data written by to_store(), totals are recomputed only when missing
+        return cls(dict(store['ratings']), votes, dict(store['totals']) if store.get('totals') else None)
+
+    def to_store(self):
+        return {'ratings': self.ratings, 'totals': self.totals}
+
+    def set_rating(self, state, code):
+        previous = self.ratings[state]
+        self.ratings[state] = code
+        self.totals[rating_side(previous)] -= self.votes[state]
+        self.totals[rating_side(code)] += self.votes[state]
+        if code == tossup:
+            self.tossups.add(state)
+        else:
+            self.tossups.discard(state)
+
+    def remaining_tossups(self):
+        # Largest first, ties by state
+        return sorted(self.tossups, key=lambda state: (-self.votes[state], state))
+
+    def path_to_270(self, party):
+        # Fewest tossups that bring the party to 270, None when even all of them fall short
+        needed = max(0, votes_to_win - self.totals[party])
+        path = []
+        gained = 0
+        for state in self.remaining_tossups():
+            if gained >= needed:
+                break
+            path.append(state)
+            gained += self.votes[state]
+        return needed, (path if gained >= needed else None)
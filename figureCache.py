@@ -0,0 +1,175 @@
+import json
+import os
+import sqlite3
+import zlib
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock, local
+
+from plotly.utils import PlotlyJSONEncoder
+
+
+def serialize_outputs(value):
+    return json.dumps(value, cls=PlotlyJSONEncoder).encode('utf-8')
+
+
+class ArtifactStore:
+    # Read-only SQLite file of prerendered outputs, see prerender.py
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self._local = local()
+        self.available = False
+        if os.path.exists(path):
+            # A store rendered from other data files is stale and ignored
+            try:
+                row = self._connection().execute("SELECT value FROM meta WHERE name = 'fingerprint'").fetchone()
+                self.available = row is not None and row[0] == fingerprint
+            except sqlite3.DatabaseError:
+                self.available = False
+
+    def _connection(self):
+        # One connection per thread and per process, workers may be forked
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, namespace, key):
+        if not self.available:
+            return None
+        row = self._connection().execute(
+            "SELECT payload FROM outputs WHERE namespace = ? AND key = ?",
+            (namespace, json.dumps(list(key)))
+        ).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+
+def write_artifact_store(path, fingerprint, entries):
+    # Write to a temporary file first so running workers never see a partial store
+    tmp_path = f'{path}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("CREATE TABLE outputs (namespace TEXT, key TEXT, payload BLOB, PRIMARY KEY (namespace, key))")
+    count = 0
+    for namespace, key, value in entries:
+        conn.execute(
+            "INSERT INTO outputs VALUES (?, ?, ?)",
+            (namespace, json.dumps(list(key)), zlib.compress(serialize_outputs(value), 9))
+        )
+        count += 1
+    conn.execute("INSERT INTO meta VALUES ('fingerprint', ?)", (fingerprint,))
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+    os.replace(tmp_path, path)
+    return count
+
+
+# Every named FigureCache by namespace, for /cache-stats and the benchmarks
+registry = {}
+
+
+class FigureCache:
+    # Bounded LRU store of serialized callback outputs (figures, tables, counts),
+    # optionally backed by a prerendered ArtifactStore
+
+    def __init__(self, maxsize=256, store=None, namespace=None):
+        self.maxsize = maxsize
+        self.store = store
+        self.namespace = namespace
+        if namespace is not None:
+            registry[namespace] = self
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if payload is None:
+            payload = self.store.get(self.namespace, key) if self.store is not None else None
+            if payload is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+            self._insert(key, payload)
+            with self._lock:
+                self.store_hits += 1
+        # Decode outside the lock; every hit gets its own copy of the outputs
+        return json.loads(payload)
+
+    def put(self, key, value):
+        payload = serialize_outputs(value)
+        self._insert(key, payload)
+        return payload
+
+    def _insert(self, key, payload):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            # Evict the least recently used entries
+            while len(self._entries) > self.maxsize:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def invalidate(self, match):
+        # Drop the entries whose key matches, e.g. the outputs of years that received live results
+        with self._lock:
+            stale = [key for key in self._entries if match(key)]
+            for key in stale:
+                self._bytes -= len(self._entries.pop(key))
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.store_hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.store_hits) / lookups, 4) if lookups else 0.0,
+                'bytes': self._bytes,
+            }
+
+
+def memoize_outputs(cache, key):
+    # Cache a callback's outputs under key(*args), the normalized callback inputs.
+    # None (nothing to show yet) is returned without being cached.
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            cache_key = key(*args)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+            outputs = func(*args)
+            if outputs is None:
+                return None
+            return json.loads(cache.put(cache_key, outputs))
+        return wrapper
+    return decorator
@@ -0,0 +1,18 @@
+import multiprocessing
+import os
+
+import usElections
+
+# Production server: gunicorn --config gunicorn.conf.py
+wsgi_app = 'usElections:server'
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.getenv('WEB_THREADS', '4'))
+timeout = int(os.getenv('WEB_TIMEOUT', '60'))
+
+# Import the app in the master so the data is loaded once and shared by the workers
+preload_app = True
+
+
+def on_starting(server):
+    usElections.preload()
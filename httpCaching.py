@@ -0,0 +1,142 @@
+import gzip
+import hashlib
+import os
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from threading import Lock
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip is used without it
+    brotli = None
+
+# Compression and cache headers for everything the Flask server sends:
+#   - callback, layout and API responses are compressed on the fly (brotli, else gzip)
+#   - static files (Dash bundles with plotly.js, assets) and responses carrying an ETag
+#     (/api/results, county shapes) are compressed once and kept in a small LRU; their
+#     ETag becomes weak, the compressed and plain bodies differ byte for byte
+#   - assets requested with their content fingerprint (asset_url) are cached for a year,
+#     other asset requests revalidate with the ETag
+# Raw and sent bytes are counted per endpoint and shown by /cache-stats.
+
+assets_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+compressible_mimetypes = {
+    'application/json', 'application/geo+json', 'application/javascript', 'text/javascript',
+    'text/html', 'text/css', 'text/plain', 'image/svg+xml',
+}
+minimum_size = 1024  # Smaller bodies do not fill a packet anyway
+static_cache_size = 64
+
+static_payloads = OrderedDict()
+stats = defaultdict(lambda: {'responses': 0, 'raw_bytes': 0, 'sent_bytes': 0})
+stats_lock = Lock()
+
+
+@lru_cache(maxsize=None)
+def asset_fingerprint(name):
+    with open(os.path.join(assets_folder, name), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def asset_url(name):
+    # URL of an assets/ file that browsers may cache forever, it changes with the file
+    try:
+        return f"assets/{name}?v={asset_fingerprint(name)}"
+    except OSError:
+        return f"assets/{name}"
+
+
+def compress(body, encoding, cached):
+    # Bodies compressed once get the slower, smaller settings
+    # (brotli 11 would take seconds on the plotly.js bundle)
+    if encoding == 'br':
+        return brotli.compress(body, quality=8 if cached else 5)
+    return gzip.compress(body, 9 if cached else 6)
+
+
+def endpoint_name():
+    if request.path.endswith('/_dash-update-component'):
+        return 'callbacks'
+    if request.path.startswith(('/assets/', '/_dash-component-suites/')):
+        return 'static'
+    return request.path
+
+
+def compression_stats():
+    with stats_lock:
+        return {
+            name: dict(counts, ratio=round(counts['sent_bytes'] / counts['raw_bytes'], 4) if counts['raw_bytes'] else 1.0)
+            for name, counts in stats.items()
+        }
+
+
+def init_app(server):
+
+    @server.after_request
+    def cache_assets(response):
+        if request.path.startswith('/assets/') and response.status_code in (200, 304):
+            name = request.path[len('/assets/'):]
+            fingerprinted = request.args.get('m') is not None  # Dash's own ?m=<mtime> links
+            try:
+                fingerprinted = fingerprinted or request.args.get('v') == asset_fingerprint(name)
+            except OSError:
+                pass
+            if fingerprinted:
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = 31536000
+                response.cache_control.immutable = True
+            else:
+                response.cache_control.no_cache = True
+        return response
+
+    @server.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or 'Content-Encoding' in response.headers
+                or response.mimetype not in compressible_mimetypes or response.is_streamed and not response.direct_passthrough):
+            return response
+        encodings = request.accept_encodings
+        encoding = 'br' if brotli is not None and 'br' in encodings else ('gzip' if 'gzip' in encodings else None)
+        if encoding is None:
+            return response
+
+        # Files sent by send_file, Dash's bundles whose URLs carry their version, and
+        # responses whose ETag identifies the body
+        etag = response.get_etag()[0]
+        cached = response.direct_passthrough or request.path.startswith('/_dash-component-suites/') or etag
+        response.direct_passthrough = False
+        body = response.get_data()
+        if len(body) < minimum_size:
+            return response
+
+        if cached:
+            key = (request.path, etag, encoding)
+            with stats_lock:
+                compressed = static_payloads.get(key)
+                if compressed is not None:
+                    static_payloads.move_to_end(key)
+            if compressed is None:
+                compressed = compress(body, encoding, True)
+                with stats_lock:
+                    static_payloads[key] = compressed
+                    while len(static_payloads) > static_cache_size:
+                        static_payloads.popitem(last=False)
+        else:
+            compressed = compress(body, encoding, False)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        if etag:
+            # Same resource, other bytes: conditional requests compare ETags weakly
+            response.set_etag(etag, weak=True)
+
+        with stats_lock:
+            counts = stats[endpoint_name()]
+            counts['responses'] += 1
+            counts['raw_bytes'] += len(body)
+            counts['sent_bytes'] += len(compressed)
+        return response
@@ -0,0 +1,161 @@
+import hmac
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from threading import Lock, local
+
+from flask import Response, abort, g, has_request_context, request
+
+# Opt-in callback timing (CALLBACK_METRICS=1). Every timed callback records its total
+# time, the render functions mark their data preparation and figure construction stages,
+# and the request hooks attribute the rest of the request, mostly Dash's JSON
+# serialization of the outputs, to "serialization". Metrics are kept per process.
+# The sampling profiler holds a worker thread for its whole duration, so it is only served
+# with a token (PROFILE_TOKEN) and one profile at a time.
+
+enabled = False
+
+max_profile_seconds = 30.0
+_profiling = Lock()
+
+buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_metrics = {}  # (callback, stage) -> [bucket counts, sum, count]
+_lock = Lock()
+_current = local()
+
+
+def observe(callback, stage, seconds):
+    with _lock:
+        entry = _metrics.get((callback, stage))
+        if entry is None:
+            entry = _metrics[(callback, stage)] = [[0] * len(buckets), 0.0, 0]
+        for i, bound in enumerate(buckets):
+            if seconds <= bound:
+                entry[0][i] += 1
+        entry[1] += seconds
+        entry[2] += 1
+
+
+def timed(func):
+    @wraps(func)
+    def wrapper(*args):
+        if not enabled:
+            return func(*args)
+        _current.callback = func.__name__
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.callback = None
+            observe(func.__name__, 'callback', elapsed)
+            if has_request_context():
+                g.callback_name = func.__name__
+                g.callback_seconds = elapsed
+    return wrapper
+
+
+class StageTimer:
+    # Records the time since the previous mark under the callback being timed
+
+    def __init__(self):
+        self.callback = getattr(_current, 'callback', None)
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        if enabled and self.callback:
+            observe(self.callback, stage, now - self.last)
+        self.last = now
+
+
+def render_prometheus():
+    lines = [
+        '# HELP dash_callback_stage_seconds Time spent per callback and stage.',
+        '# TYPE dash_callback_stage_seconds histogram',
+    ]
+    with _lock:
+        entries = sorted(_metrics.items())
+    for (callback, stage), (counts, total, count) in entries:
+        labels = f'callback="{callback}",stage="{stage}"'
+        for bound, bucket_count in zip(buckets, counts):
+            lines.append(f'dash_callback_stage_seconds_bucket{{{labels},le="{bound}"}} {bucket_count}')
+        lines.append(f'dash_callback_stage_seconds_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f'dash_callback_stage_seconds_sum{{{labels}}} {total:.6f}')
+        lines.append(f'dash_callback_stage_seconds_count{{{labels}}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def sample_profile(seconds=5.0, interval=0.005):
+    # Sample the stacks of every other thread, in collapsed format for flame graph tools
+    stacks = Counter()
+    own_thread = threading.get_ident()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)})")
+                frame = frame.f_back
+            stacks[';'.join(reversed(stack))] += 1
+        time.sleep(interval)
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+
+def profile_seconds(value):
+    # Duration asked by /debug/profile, None when it is not a number in (0, max_profile_seconds]
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(seconds) or seconds <= 0:
+        return None
+    return min(seconds, max_profile_seconds)
+
+
+def init_app(server, profile_token=None):
+    global enabled
+    enabled = True
+
+    @server.before_request
+    def start_request_timer():
+        if request.path.endswith('/_dash-update-component'):
+            g.request_start = time.perf_counter()
+
+    @server.after_request
+    def record_serialization(response):
+        if 'request_start' in g and 'callback_name' in g:
+            elapsed = time.perf_counter() - g.request_start
+            observe(g.callback_name, 'serialization', max(0.0, elapsed - g.callback_seconds))
+            observe(g.callback_name, 'request', elapsed)
+        return response
+
+    @server.route('/metrics')
+    def metrics():
+        return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    if not profile_token:
+        return
+
+    @server.route('/debug/profile')
+    def profile():
+        # Authorization: Bearer <PROFILE_TOKEN>
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode('utf-8'), profile_token.encode('utf-8')):
+            abort(403)
+        seconds = profile_seconds(request.args.get('seconds', 5))
+        if seconds is None:
+            abort(400, description=f"seconds must be a number between 0 and {max_profile_seconds:g}")
+        if not _profiling.acquire(blocking=False):
+            abort(429, description="A profile is already running")
+        try:
+            return Response(sample_profile(seconds), mimetype='text/plain')
+        finally:
+            _profiling.release()
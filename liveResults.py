@@ -0,0 +1,125 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from numbers import Number
+
+from electionData import live_result_fields
+
+# Tails an append-only feed of live results: a JSONL file, or a directory where
+# *.jsonl files are dropped (read in name order). Every line is one update,
+#   {"year": 2028, "state_po": "PA", "party": "DEM", "candidatevotes": 1200345, "totalvotes": 2410332}
+# and complete lines are handed to on_records in batches. Every worker process tails
+# the feed on its own, starting from the beginning, so all of them converge to the same state.
+# An optional "candidate" names the candidate when a party has several in a state.
+
+logger = logging.getLogger(__name__)
+
+# Presidential elections only, and vote counts that fit the results table (int32)
+valid_years = range(1788, 2201)
+max_votes = 2 ** 31 - 1
+
+
+def parse_record(line):
+    # None for lines that are not a valid update
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or any(field not in record for field in live_result_fields):
+        return None
+    counts = [record[field] for field in ('year', 'candidatevotes', 'totalvotes')]
+    if not all(isinstance(value, Number) and not isinstance(value, bool) and math.isfinite(value) for value in counts):
+        return None
+    if record['year'] != int(record['year']) or int(record['year']) not in valid_years:
+        return None
+    if not all(0 <= value <= max_votes for value in counts[1:]):
+        return None
+    if not all(isinstance(record[field], str) and record[field] for field in ('state_po', 'party')):
+        return None
+    if record.get('candidate') is not None and not isinstance(record['candidate'], str):
+        return None
+    return record
+
+
+class LiveResultsFeed:
+
+    def __init__(self, path, on_records, interval=2.0):
+        self.path = path
+        self.on_records = on_records
+        self.interval = interval
+        self.offsets = {}  # file path -> bytes consumed
+        self.applied = 0
+        self.rejected = 0
+        self.failed_batches = 0
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def files(self):
+        if os.path.isdir(self.path):
+            names = sorted(name for name in os.listdir(self.path) if name.endswith('.jsonl'))
+            return [os.path.join(self.path, name) for name in names]
+        return [self.path] if os.path.exists(self.path) else []
+
+    def read_new_lines(self, file_path):
+        offset = self.offsets.get(file_path, 0)
+        if os.path.getsize(file_path) < offset:
+            offset = 0  # The file was truncated or replaced, read it again
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            chunk = f.read()
+        # A line still being written is picked up by the next poll
+        end = chunk.rfind(b'\n') + 1
+        self.offsets[file_path] = offset + end
+        return chunk[:end].decode('utf-8').splitlines()
+
+    def poll(self):
+        with self._lock:
+            records = []
+            for file_path in self.files():
+                for line in self.read_new_lines(file_path):
+                    if not line.strip():
+                        continue
+                    record = parse_record(line)
+                    if record is None:
+                        self.rejected += 1
+                    else:
+                        records.append(record)
+            if records:
+                try:
+                    self.on_records(records)
+                except Exception:
+                    # The offsets already moved on: drop the batch, keep tailing the feed
+                    logger.exception("Live results batch of %d records failed", len(records))
+                    self.failed_batches += 1
+                    self.rejected += len(records)
+                    return 0
+                self.applied += len(records)
+            return len(records)
+
+    def run(self):
+        while True:
+            try:
+                self.poll()
+            except OSError:
+                pass  # The feed may be mid-rotation, try again on the next tick
+            except Exception:
+                logger.exception("Live results poll failed")
+            time.sleep(self.interval)
+
+    def ensure_started(self):
+        # Threads do not survive a fork: start one per worker process, on its first request
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self.run, name='live-results', daemon=True).start()
+
+    def stats(self):
+        return {
+            'path': self.path, 'applied': self.applied, 'rejected': self.rejected,
+            'failed_batches': self.failed_batches, 'files': len(self.offsets),
+        }
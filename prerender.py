@@ -0,0 +1,34 @@
+import sys
+from itertools import product
+
+import dashboard
+import usElections
+from figureCache import write_artifact_store
+
+# Render every possible output of the Results and Evolution callbacks ahead of time.
+# Run again whenever usPresidentialResults.csv, electoralData.xlsx or the rendering code change
+# (the store is ignored otherwise, see dashboard.artifact_fingerprint):
+#   python prerender.py [output_path]
+
+
+def iter_outputs():
+    years = sorted(dashboard.data['results_cube'])
+    color_modes = (0, 1)
+
+    # __wrapped__ is the callback body without the cache in front of it
+    for year, color_mode in product(years, color_modes):
+        yield 'results', (year, color_mode), dashboard.render_results.__wrapped__(year, color_mode)
+
+    for start_year, end_year, data_selector, color_mode in product(years, years, ('REP', 'DEM', 'MARGIN'), color_modes):
+        outputs = dashboard.render_evolution.__wrapped__(start_year, end_year, data_selector, color_mode)
+        yield 'evolution', (start_year, end_year, data_selector, color_mode), outputs
+
+
+def main(path=usElections.artifact_path):
+    usElections.create_app()
+    count = write_artifact_store(path, dashboard.artifact_fingerprint(), iter_outputs())
+    print(f"Wrote {count} prerendered outputs to {path}")
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
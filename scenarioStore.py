@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock, local
+
+# Server-side Election Night scenarios. A scenario only keeps the states whose rating
+# code (see electoralTally.py) was changed, keyed by a random handle kept in the browser.
+
+
+def new_scenario_id():
+    return uuid.uuid4().hex
+
+
+class MemoryScenarioStore:
+    # Per-process store, each gunicorn worker has its own: use SQLite with several workers
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._scenarios = OrderedDict()
+        self._lock = Lock()
+
+    def create(self):
+        scenario_id = new_scenario_id()
+        with self._lock:
+            self._scenarios[scenario_id] = {}
+            # Forget the least recently used scenarios
+            while len(self._scenarios) > self.maxsize:
+                self._scenarios.popitem(last=False)
+        return scenario_id
+
+    def get(self, scenario_id):
+        with self._lock:
+            ratings = self._scenarios.get(scenario_id)
+            if ratings is None:
+                return None
+            self._scenarios.move_to_end(scenario_id)
+            return dict(ratings)
+
+    def set_rating(self, scenario_id, state, rating):
+        with self._lock:
+            self._scenarios.setdefault(scenario_id, {})[state] = rating
+            self._scenarios.move_to_end(scenario_id)
+
+
+class SqliteScenarioStore:
+    # Shared by every worker process on the host, bounded like MemoryScenarioStore: the least
+    # recently used scenarios beyond maxsize are deleted as new ones are created
+
+    def __init__(self, path, maxsize=10000):
+        self.path = path
+        self.maxsize = maxsize
+        self._local = local()
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS scenarios (scenario_id TEXT PRIMARY KEY, updated REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS scenarios_updated ON scenarios (updated)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scenario_ratings "
+                "(scenario_id TEXT, state_po TEXT, rating INTEGER, PRIMARY KEY (scenario_id, state_po))"
+            )
+
+    def _connection(self):
+        # One connection per thread and per process, workers may be forked
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create(self):
+        scenario_id = new_scenario_id()
+        with self._connection() as conn:
+            conn.execute("INSERT INTO scenarios VALUES (?, ?)", (scenario_id, time.time()))
+            self._prune(conn)
+        return scenario_id
+
+    def _prune(self, conn):
+        # Forget the least recently used scenarios, with their ratings
+        row = conn.execute(
+            "SELECT updated FROM scenarios ORDER BY updated DESC LIMIT 1 OFFSET ?", (self.maxsize,)
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "DELETE FROM scenario_ratings WHERE scenario_id IN (SELECT scenario_id FROM scenarios WHERE updated <= ?)",
+                row
+            )
+            conn.execute("DELETE FROM scenarios WHERE updated <= ?", row)
+
+    def get(self, scenario_id):
+        conn = self._connection()
+        with conn:
+            touched = conn.execute(
+                "UPDATE scenarios SET updated = ? WHERE scenario_id = ?", (time.time(), scenario_id)
+            ).rowcount
+        if not touched:
+            return None
+        rows = conn.execute("SELECT state_po, rating FROM scenario_ratings WHERE scenario_id = ?", (scenario_id,))
+        return dict(rows.fetchall())
+
+    def set_rating(self, scenario_id, state, rating):
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO scenarios VALUES (?, ?)", (scenario_id, time.time()))
+            conn.execute("INSERT OR REPLACE INTO scenario_ratings VALUES (?, ?, ?)", (scenario_id, state, rating))
+
+
+def open_scenario_store(backend, path=None):
+    if backend == 'memory':
+        return MemoryScenarioStore()
+    if backend == 'sqlite':
+        return SqliteScenarioStore(path)
+    raise ValueError(f"Unknown scenario store backend: {backend!r}")
@@ -0,0 +1,92 @@
+import numpy as np
+
+from electoralTally import votes_to_win
+
+# Project a year from a base year plus a DEM-REP swing, in margin points (positive towards DEM):
+#   uniform       every state's margin moves by the swing
+#   proportional  each party moves in proportion to its share in the state relative to its
+#                 average share, so the average margin still moves by the swing
+# Both are linear in the swing, so each state flips at a single swing that is solved directly.
+
+swing_modes = ('uniform', 'proportional')
+
+
+def reported(engine, year):
+    # States with a result in that year, unreported ones have no share at all
+    return ~np.isnan(engine['pct'][:, engine['year_index'][year]]).all(axis=1)
+
+
+def base_shares(engine, electoral_votes, base_year, other_year=None):
+    # DEM and REP shares of the base year, for the states with electoral votes and a result
+    # in the base year (and in other_year when given)
+    year = engine['year_index'][base_year]
+    dem = np.nan_to_num(engine['pct'][:, year, engine['party_index']['DEM']])
+    rep = np.nan_to_num(engine['pct'][:, year, engine['party_index']['REP']])
+    keep = engine['states'].isin(list(electoral_votes)) & reported(engine, base_year)
+    if other_year is not None:
+        keep &= reported(engine, other_year)
+    states = engine['states'][keep].tolist()
+    votes = np.array([electoral_votes[state] for state in states], dtype=np.int64)
+    return states, dem[keep], rep[keep], votes
+
+
+def swing_slopes(dem, rep, mode):
+    # Change of the DEM and REP shares per unit of swing, margin points as fractions
+    if mode == 'uniform':
+        return np.full_like(dem, 0.5), np.full_like(rep, 0.5)
+    return 0.5 * dem / dem.mean(), 0.5 * rep / rep.mean()
+
+
+def project(engine, electoral_votes, base_year, swings, mode='uniform'):
+    # Shares, winners and electoral votes for every swing of the grid at once (grid x states)
+    states, dem, rep, votes = base_shares(engine, electoral_votes, base_year)
+    dem_slope, rep_slope = swing_slopes(dem, rep, mode)
+    swings = np.atleast_1d(np.asarray(swings, dtype=float))[:, None] / 100
+
+    dem_pct = np.clip(dem + swings * dem_slope, 0.0, 1.0)
+    rep_pct = np.clip(rep - swings * rep_slope, 0.0, 1.0)
+    dem_won = dem_pct > rep_pct
+    dem_ev = dem_won.astype(np.int64) @ votes
+    return {
+        'states': states,
+        'dem_pct': dem_pct,
+        'rep_pct': rep_pct,
+        'dem_won': dem_won,
+        'dem_ev': dem_ev,
+        'rep_ev': int(votes.sum()) - dem_ev,
+    }
+
+
+def flip_swings(engine, electoral_votes, base_year, mode='uniform'):
+    # Swing, in margin points, at which every state changes hands, NaN for states that never do
+    states, dem, rep, votes = base_shares(engine, electoral_votes, base_year)
+    dem_slope, rep_slope = swing_slopes(dem, rep, mode)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return states, 100 * (rep - dem) / (dem_slope + rep_slope), votes
+
+
+def tipping_point_swing(engine, electoral_votes, base_year, mode='uniform'):
+    # Smallest swing that gives DEM 270 electoral votes, and the state that gets it there.
+    # States flip to DEM in the order of their flip swings, so the answer is the flip
+    # swing where the cumulative DEM electoral votes cross 270. None when the states
+    # reported in the base year do not add up to 270.
+    states, flips, votes = flip_swings(engine, electoral_votes, base_year, mode)
+    # States without DEM or REP votes never flip
+    order = np.flatnonzero(np.isfinite(flips))
+    order = order[np.argsort(flips[order])]
+    cumulative = np.cumsum(votes[order])
+    if not len(cumulative) or cumulative[-1] < votes_to_win:
+        return None
+    tipping = order[np.argmax(cumulative >= votes_to_win)]
+    return {'state': states[tipping], 'swing': float(flips[tipping])}
+
+
+def historical_swing(engine, electoral_votes, from_year, to_year):
+    # Electoral vote weighted average of the state margin changes between two elections, in points,
+    # over the states reported in both
+    _, dem_from, rep_from, votes = base_shares(engine, electoral_votes, from_year, to_year)
+    _, dem_to, rep_to, _ = base_shares(engine, electoral_votes, to_year, from_year)
+    if not votes.sum():
+        return 0.0
+    change = (dem_to - rep_to) - (dem_from - rep_from)
+    return float(100 * np.average(change, weights=votes))
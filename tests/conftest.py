@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# The modules live at the top of the repository, next to usElections.py
+repo_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_directory)
+
+from electionData import load_election_data  # noqa: E402
+
+
+@pytest.fixture
+def load_results(tmp_path):
+    # Dataset of load_election_data from (year, state, state_po, party, candidate, candidatevotes,
+    # totalvotes) rows, with the repository's electoral votes
+    def load(rows):
+        columns = ['year', 'state', 'state_po', 'party', 'candidate', 'candidatevotes', 'totalvotes']
+        df = pd.DataFrame(rows, columns=columns)
+        df.insert(0, 'id', range(1, len(df) + 1))
+        df['pct'] = (df['candidatevotes'] / df['totalvotes']).round(3)
+        df['margin'] = 0.0
+        csv_path = tmp_path / 'results.csv'
+        df.to_csv(csv_path, index=False)
+        return load_election_data(
+            str(csv_path), os.path.join(repo_directory, 'electoralData.xlsx'), str(tmp_path / 'bundle.npz')
+        )
+    return load
@@ -0,0 +1,129 @@
+import os
+import time
+
+import pytest
+
+from backgroundJobs import JobQueue, job_id_for
+
+# Jobs run in pool processes, which import them from this module by name
+
+
+def add(progress, a, b):
+    progress(0.5)
+    return {'sum': a + b}
+
+
+def fail_while(progress, marker):
+    if os.path.exists(marker):
+        raise ValueError('marker present')
+    return 'ok'
+
+
+def crash(progress):
+    os._exit(1)
+
+
+def wait(queue, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = queue.status(job_id)
+        if status['status'] in ('done', 'failed'):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} still {status}')
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite'), max_jobs=10)
+    yield queue
+    if queue._executor is not None:
+        queue._executor.shutdown()
+
+
+def test_job_runs_to_its_result(queue):
+    job_id = queue.submit('test_backgroundJobs:add', {'a': 2, 'b': 3})
+    assert job_id == job_id_for('test_backgroundJobs:add', {'b': 3, 'a': 2})
+    assert queue.status(job_id)['status'] in ('queued', 'running', 'done')
+
+    assert wait(queue, job_id) == {'status': 'done', 'progress': 1, 'error': None}
+    assert queue.result(job_id) == {'sum': 5}
+    assert queue.stats()['jobs'] == {'done': 1}
+    assert queue.status('unknown') is None
+    assert queue.result('unknown') is None
+
+
+def test_same_work_is_one_job(queue):
+    first = queue.submit('test_backgroundJobs:add', {'a': 1, 'b': 1})
+    wait(queue, first)
+    assert queue.submit('test_backgroundJobs:add', {'a': 1, 'b': 1}) == first
+    assert queue.stats()['jobs'] == {'done': 1}
+
+
+def test_failed_job_runs_again_when_resubmitted(queue, tmp_path):
+    marker = tmp_path / 'marker'
+    marker.touch()
+    job_id = queue.submit('test_backgroundJobs:fail_while', {'marker': str(marker)})
+    status = wait(queue, job_id)
+    assert status['status'] == 'failed'
+    assert status['error'] == 'ValueError: marker present'
+    assert queue.result(job_id) is None
+
+    marker.unlink()
+    assert queue.submit('test_backgroundJobs:fail_while', {'marker': str(marker)}) == job_id
+    assert wait(queue, job_id)['status'] == 'done'
+    assert queue.result(job_id) == 'ok'
+
+
+def test_lost_pool_process_fails_the_job_and_the_pool_restarts(queue):
+    job_id = queue.submit('test_backgroundJobs:crash', {})
+    status = wait(queue, job_id)
+    assert status['status'] == 'failed'
+    assert status['error'].startswith('BrokenProcessPool')
+
+    after = queue.submit('test_backgroundJobs:add', {'a': 4, 'b': 4})
+    assert wait(queue, after)['status'] == 'done'
+    assert queue.stats()['running_here'] == 0
+
+
+def test_finished_jobs_are_pruned(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite'), max_jobs=2)
+    try:
+        for a in range(4):
+            wait(queue, queue.submit('test_backgroundJobs:add', {'a': a, 'b': 0}))
+        queue.prune()
+        assert queue.stats()['jobs'] == {'done': 2}
+        assert queue.result(job_id_for('test_backgroundJobs:add', {'a': 3, 'b': 0})) == {'sum': 3}
+    finally:
+        queue._executor.shutdown()
+
+
+def test_abandoned_running_job_is_claimed_again(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite'), stale_after=0)
+    with queue._connection() as conn:
+        conn.execute(
+            "INSERT INTO jobs VALUES ('lost', 'test_backgroundJobs:add', '{\"a\": 1, \"b\": 2}', 'running', 0.3, "
+            "NULL, NULL, 0, 0)"
+        )
+    assert queue.claim() == ('lost', 'test_backgroundJobs:add', {'a': 1, 'b': 2})
+
+
+def test_submit_refuses_new_jobs_past_max_queued(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite'), max_queued=2)
+    # Two jobs waiting for another worker's pool
+    with queue._connection() as conn:
+        for job_id in ('waiting-1', 'waiting-2'):
+            conn.execute(f"INSERT INTO jobs VALUES ('{job_id}', 'other:job', '{{}}', 'queued', 0, NULL, NULL, 0, 0)")
+        conn.execute("INSERT INTO jobs VALUES (?, 'test_backgroundJobs:add', '{}', 'failed', 0, NULL, 'lost', 0, 0)",
+                     (job_id_for('test_backgroundJobs:add', {}),))
+    queue.claim = lambda: None  # Keep them waiting
+
+    assert queue.submit('test_backgroundJobs:add', {'a': 1, 'b': 2}) is None
+    assert queue.status(job_id_for('test_backgroundJobs:add', {'a': 1, 'b': 2})) is None
+    # A failed job is not queued again either
+    assert queue.submit('test_backgroundJobs:add', {}) is None
+    assert queue.stats()['jobs'] == {'queued': 2, 'failed': 1}
+    # Work already queued is still found
+    with queue._connection() as conn:
+        conn.execute("UPDATE jobs SET job_id = ? WHERE job_id = 'waiting-1'", (job_id_for('other:job', {}),))
+    assert queue.submit('other:job', {}) == job_id_for('other:job', {})
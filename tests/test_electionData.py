@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from electionData import apply_live_results, evolution_frame, evolution_rankings, selector_values
+
+
+def state_results(year, state, state_po, dem, rep, other=0):
+    total = dem + rep + other
+    rows = [
+        (year, state, state_po, 'DEM', 'DEM CANDIDATE', dem, total),
+        (year, state, state_po, 'REP', 'REP CANDIDATE', rep, total),
+    ]
+    if other:
+        rows.append((year, state, state_po, 'OTHER', 'WRITE-IN', other, total))
+    return rows
+
+
+@pytest.fixture
+def dataset(load_results):
+    return load_results(
+        state_results(2020, 'ALABAMA', 'AL', 400, 600)
+        + state_results(2020, 'PENNSYLVANIA', 'PA', 500, 480, 20)
+        + state_results(2020, 'WISCONSIN', 'WI', 490, 500, 10)
+        + state_results(2024, 'ALABAMA', 'AL', 350, 650)
+        + state_results(2024, 'PENNSYLVANIA', 'PA', 480, 500, 20)
+        + state_results(2024, 'WISCONSIN', 'WI', 480, 510, 10)
+    )
+
+
+def update(year, state_po, party, votes, total, **fields):
+    return {'year': year, 'state_po': state_po, 'party': party, 'candidatevotes': votes, 'totalvotes': total, **fields}
+
+
+def state_frame(dataset, year, state_po):
+    df = dataset['df']
+    return df[(df['year'] == year) & (df['state_po'] == state_po)]
+
+
+def test_partial_year_leaves_unreported_states_out(dataset):
+    reported = apply_live_results(dataset, [update(2028, 'PA', 'DEM', 60, 100), update(2028, 'PA', 'REP', 40, 100)])
+    assert reported == {2028: {'PA'}}
+
+    engine = dataset['margin_engine']
+    margins = engine['margin'][:, engine['year_index'][2028]]
+    assert np.isnan(margins[engine['states'].get_loc('AL')])
+    assert np.isnan(margins[engine['states'].get_loc('WI')])
+    assert margins[engine['states'].get_loc('PA')] == pytest.approx(-0.2)
+
+    # Evolution views only rank the states reported in both years
+    assert evolution_frame(engine, 2024, 2028, 'MARGIN')['state_po'].tolist() == ['PA']
+    for states, changes in evolution_rankings(engine, dataset['evolution_index'], 2024, 2028, 'MARGIN'):
+        assert states.tolist() == ['PA']
+        assert changes.tolist() == [pytest.approx(-22.0)]
+    assert dataset['results_cube'][2028]['states']['state_po'].tolist() == ['PA']
+
+
+def test_shares_follow_the_latest_total(dataset):
+    # Only DEM is updated, the REP and OTHER shares of PA still move with the new total
+    apply_live_results(dataset, [update(2024, 'PA', 'DEM', 520, 900), update(2024, 'PA', 'DEM', 600, 1120)])
+
+    rows = state_frame(dataset, 2024, 'PA').set_index('party')
+    assert (rows['totalvotes'] == 1120).all()
+    assert rows.loc['DEM', 'candidatevotes'] == 600
+    for party in ('DEM', 'REP', 'OTHER'):
+        assert rows.loc[party, 'pct'] == pytest.approx(rows.loc[party, 'candidatevotes'] / 1120, abs=1e-6)
+    assert rows['pct'].sum() == pytest.approx(1.0, abs=1e-6)
+
+    engine = dataset['margin_engine']
+    year = engine['year_index'][2024]
+    state = engine['states'].get_loc('PA')
+    assert engine['pct'][state, year, engine['party_index']['REP']] == pytest.approx(500 / 1120, abs=1e-6)
+    assert engine['margin'][state, year] == pytest.approx((500 - 600) / 1120, abs=1e-6)
+
+    # Other states keep their shares
+    assert state_frame(dataset, 2024, 'WI').set_index('party').loc['DEM', 'pct'] == pytest.approx(0.48)
+
+
+def test_candidates_of_one_party_add_up(dataset):
+    apply_live_results(dataset, [
+        update(2024, 'WI', 'OTHER', 15, 1010, candidate='WRITE-IN'),
+        update(2024, 'WI', 'OTHER', 5, 1010, candidate='INDEPENDENT'),
+    ])
+
+    rows = state_frame(dataset, 2024, 'WI')
+    others = rows[rows['party'] == 'OTHER'].set_index('candidate')
+    assert others['candidatevotes'].to_dict() == {'WRITE-IN': 15, 'INDEPENDENT': 5}
+    assert (rows['totalvotes'] == 1010).all()
+
+    engine = dataset['margin_engine']
+    other = selector_values(engine, 'OTHER')[engine['states'].get_loc('WI'), engine['year_index'][2024]]
+    assert other == pytest.approx(20 / 1010, abs=1e-6)
+    assert len(rows) == 4
+
+
+def test_incremental_index_matches_a_rebuild(dataset, load_results):
+    apply_live_results(dataset, [update(2024, 'AL', 'DEM', 300, 1000), update(2024, 'AL', 'REP', 700, 1000)])
+    rebuilt = load_results(
+        state_results(2020, 'ALABAMA', 'AL', 400, 600)
+        + state_results(2020, 'PENNSYLVANIA', 'PA', 500, 480, 20)
+        + state_results(2020, 'WISCONSIN', 'WI', 490, 500, 10)
+        + state_results(2024, 'ALABAMA', 'AL', 300, 700)
+        + state_results(2024, 'PENNSYLVANIA', 'PA', 480, 500, 20)
+        + state_results(2024, 'WISCONSIN', 'WI', 480, 510, 10)
+    )
+    for selector in ('MARGIN', 'DEM', 'REP'):
+        live = evolution_rankings(dataset['margin_engine'], dataset['evolution_index'], 2020, 2024, selector)
+        fresh = evolution_rankings(rebuilt['margin_engine'], rebuilt['evolution_index'], 2020, 2024, selector)
+        for (live_states, live_changes), (fresh_states, fresh_changes) in zip(live, fresh):
+            assert live_states.tolist() == fresh_states.tolist()
+            np.testing.assert_allclose(live_changes, fresh_changes)
+
+
+def test_failed_batch_leaves_the_dataset_unchanged(dataset, monkeypatch):
+    before = dict(dataset)
+    df = dataset['df'].copy()
+    pct = dataset['margin_engine']['pct'].copy()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('summary failed')
+
+    monkeypatch.setattr('electionData.summarize_year', fail)
+    with pytest.raises(RuntimeError):
+        apply_live_results(dataset, [update(2024, 'PA', 'DEM', 600, 1120), update(2028, 'PA', 'DEM', 60, 100)])
+
+    assert all(dataset[key] is value for key, value in before.items())
+    assert dataset['df'].equals(df)
+    np.testing.assert_array_equal(dataset['margin_engine']['pct'], pct)
+
+
+def test_tables_read_before_a_batch_stay_as_they_were(dataset):
+    engine, index, cube = dataset['margin_engine'], dataset['evolution_index'], dataset['results_cube']
+    margin = engine['margin'].copy()
+    rankings = index['rankings']['MARGIN']['smallest'].copy()
+
+    apply_live_results(dataset, [update(2024, 'AL', 'DEM', 700, 1000), update(2024, 'AL', 'REP', 300, 1000)])
+
+    assert dataset['margin_engine'] is not engine
+    np.testing.assert_array_equal(engine['margin'], margin)
+    np.testing.assert_array_equal(index['rankings']['MARGIN']['smallest'], rankings)
+    assert cube[2024]['states'].set_index('state_po').loc['AL', 'party'] == 'REP'
+    assert dataset['results_cube'][2024]['states'].set_index('state_po').loc['AL', 'party'] == 'DEM'
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from electionSimulator import simulate_batches, simulate_election, simulation_job
+
+
+def batches(thresholds, votes, draws=1000, correlation=0.0, seed=0):
+    # Thresholds far from zero decide every state the same way in every draw
+    return simulate_batches(
+        np.array(thresholds, dtype=np.float32), np.array(votes, dtype=np.float32), draws, correlation, seed
+    )
+
+
+def test_tipping_point_is_the_state_that_reaches_270():
+    # DEM wins A, B and C; from the safest, A and B reach 270 and C is not needed
+    ev_counts, tipping_counts = batches([30, 20, 10, -30], [200, 70, 10, 258])
+    assert ev_counts[280] == 1000
+    assert tipping_counts.tolist() == [0, 1000, 0, 0]
+
+
+def test_tipping_point_of_a_rep_win_counts_from_the_rep_side():
+    # REP's safest state is D, then C takes it to 270
+    ev_counts, tipping_counts = batches([10, -5, -20, -30], [200, 68, 20, 250])
+    assert ev_counts[200] == 1000
+    assert tipping_counts.tolist() == [0, 0, 1000, 0]
+
+
+def test_a_269_tie_has_no_tipping_point():
+    ev_counts, tipping_counts = batches([30, -30, 30, -30], [200, 200, 69, 69])
+    assert ev_counts[269] == 1000
+    assert tipping_counts.sum() == 0
+
+
+def test_batches_cover_every_draw(monkeypatch):
+    monkeypatch.setattr('electionSimulator.batch_size', 300)
+    fractions = []
+    ev_counts, _ = simulate_batches(
+        np.zeros(3, dtype=np.float32), np.array([100, 200, 238], dtype=np.float32), 1000, 0.5, 1, fractions.append
+    )
+    assert ev_counts.sum() == 1000
+    assert fractions == pytest.approx([0.3, 0.6, 0.9, 1.0])
+
+
+ratings = {'CA': 0, 'TX': 6, 'FL': 3, 'PA': 3, 'GA': 4, 'AZ': 2}
+votes = {'CA': 54, 'TX': 40, 'FL': 30, 'PA': 19, 'GA': 16, 'AZ': 11}
+
+
+def test_outcomes_add_up():
+    results = simulate_election(ratings, {**votes, 'CA': 230, 'TX': 232}, draws=20000, seed=3)
+    total_votes = len(results['ev_counts']) - 1
+    assert total_votes == 538
+    assert results['dem_win'] + results['rep_win'] + results['tie'] == pytest.approx(1.0)
+    assert results['tie'] == pytest.approx(results['ev_counts'][269] / 20000)
+    assert results['mean_dem_ev'] == pytest.approx(np.average(np.arange(539), weights=results['ev_counts']))
+    # Elections without a winner have no tipping point
+    assert sum(results['tipping_point'].values()) == pytest.approx(1.0 - results['tie'])
+
+
+def test_same_seed_same_result():
+    first = simulate_election(ratings, votes, draws=5000, seed=7)
+    second = simulate_election(ratings, votes, draws=5000, seed=7)
+    assert first['ev_counts'].tolist() == second['ev_counts'].tolist()
+    assert first['tipping_point'] == second['tipping_point']
+
+
+def test_correlation_spreads_the_outcomes():
+    independent = simulate_election(ratings, votes, draws=20000, correlation=0.0)
+    correlated = simulate_election(ratings, votes, draws=20000, correlation=0.9)
+    spread = [
+        np.sqrt(np.average((np.arange(len(result['ev_counts'])) - result['mean_dem_ev']) ** 2, weights=result['ev_counts']))
+        for result in (independent, correlated)
+    ]
+    assert spread[1] > spread[0]
+
+
+def test_simulation_job_result_is_json_ready():
+    result = simulation_job(lambda fraction: None, ratings, votes, 1000, 0.5)
+    assert isinstance(result['ev_counts'], list)
+    assert sum(result['ev_counts']) == 1000
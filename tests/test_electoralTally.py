@@ -0,0 +1,73 @@
+import pytest
+
+from electoralTally import ElectoralTally, next_rating, rating_codes, rating_side, tossup
+
+
+@pytest.mark.parametrize('label, expected', [
+    ('DEM-Solid', 'Tossup'),
+    ('DEM-Lean', 'Tossup'),
+    ('Tossup', 'REP-Lean'),
+    ('REP-Lean', 'DEM-Lean'),
+    ('REP-Solid', 'DEM-Lean'),
+])
+def test_next_rating_cycles_dem_tossup_rep(label, expected):
+    assert next_rating(rating_codes[label]) == rating_codes[expected]
+
+
+def test_next_rating_visits_every_side():
+    code = rating_codes['DEM-Solid']
+    sides = []
+    for _ in range(3):
+        code = next_rating(code)
+        sides.append(rating_side(code))
+    assert sides == ['Tossup', 'REP', 'DEM']
+
+
+def tally(ratings, votes):
+    return ElectoralTally({state: rating_codes[label] for state, label in ratings.items()}, votes)
+
+
+def test_totals_follow_rating_changes():
+    votes = {'CA': 54, 'TX': 40, 'PA': 19}
+    result = tally({'CA': 'DEM-Solid', 'TX': 'REP-Likely', 'PA': 'Tossup'}, votes)
+    assert result.totals == {'DEM': 54, 'REP': 40, 'Tossup': 19}
+
+    result.set_rating('PA', rating_codes['REP-Lean'])
+    result.set_rating('CA', tossup)
+    assert result.totals == {'DEM': 0, 'REP': 59, 'Tossup': 54}
+    assert result.tossups == {'CA'}
+    # Same totals as counting the new ratings from scratch
+    assert result.totals == tally({'CA': 'Tossup', 'TX': 'REP-Likely', 'PA': 'REP-Lean'}, votes).totals
+
+
+def test_store_round_trip_keeps_totals():
+    votes = {'CA': 54, 'PA': 19}
+    result = tally({'CA': 'DEM-Solid', 'PA': 'Tossup'}, votes)
+    restored = ElectoralTally.from_store(result.to_store(), votes)
+    assert restored.totals == result.totals
+    assert restored.tossups == {'PA'}
+
+
+def test_path_to_270_takes_largest_tossups_first():
+    votes = {'CA': 54, 'TX': 40, 'FL': 30, 'PA': 19, 'GA': 16, 'NV': 6}
+    result = tally(
+        {'CA': 'DEM-Solid', 'TX': 'REP-Solid', 'FL': 'Tossup', 'PA': 'Tossup', 'GA': 'Tossup', 'NV': 'Tossup'},
+        {**votes, 'CA': 230},
+    )
+    # 40 votes short: FL then PA, GA and NV are not needed
+    assert result.path_to_270('DEM') == (40, ['FL', 'PA'])
+
+
+def test_path_to_270_ties_by_state():
+    votes = {'AA': 250, 'MI': 10, 'ME': 10, 'NH': 4}
+    result = tally({'AA': 'DEM-Solid', 'MI': 'Tossup', 'ME': 'Tossup', 'NH': 'Tossup'}, votes)
+    assert result.remaining_tossups() == ['ME', 'MI', 'NH']
+    assert result.path_to_270('DEM') == (20, ['ME', 'MI'])
+
+
+def test_path_to_270_already_won_or_out_of_reach():
+    votes = {'AA': 280, 'BB': 250, 'CC': 8}
+    won = tally({'AA': 'DEM-Solid', 'BB': 'REP-Solid', 'CC': 'Tossup'}, votes)
+    assert won.path_to_270('DEM') == (0, [])
+    # REP needs 20 but only 8 are left
+    assert won.path_to_270('REP') == (20, None)
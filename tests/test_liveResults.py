@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from liveResults import LiveResultsFeed, parse_record
+
+valid = {'year': 2028, 'state_po': 'PA', 'party': 'DEM', 'candidatevotes': 1200345, 'totalvotes': 2410332}
+
+
+def test_parse_record_accepts_an_update():
+    assert parse_record(json.dumps(valid)) == valid
+    assert parse_record(json.dumps({**valid, 'year': 2028.0, 'candidate': 'SMITH'}))['candidate'] == 'SMITH'
+
+
+@pytest.mark.parametrize('line', [
+    'not json',
+    json.dumps([valid]),
+    json.dumps({key: value for key, value in valid.items() if key != 'party'}),
+    json.dumps({**valid, 'year': 2028.5}),
+    json.dumps({**valid, 'year': True}),
+    json.dumps({**valid, 'year': 1500}),
+    json.dumps({**valid, 'candidatevotes': -1}),
+    json.dumps({**valid, 'totalvotes': 2 ** 31}),
+    json.dumps({**valid, 'totalvotes': '2410332'}),
+    json.dumps({**valid, 'state_po': ''}),
+    json.dumps({**valid, 'party': None}),
+    json.dumps({**valid, 'candidate': 7}),
+    json.dumps(valid).replace('1200345', 'NaN'),
+])
+def test_parse_record_rejects_malformed_updates(line):
+    assert parse_record(line) is None
+
+
+def write_lines(path, records):
+    with open(path, 'a') as f:
+        for record in records:
+            f.write((record if isinstance(record, str) else json.dumps(record)) + '\n')
+
+
+def test_poll_hands_complete_lines_in_batches(tmp_path):
+    batches = []
+    feed = LiveResultsFeed(str(tmp_path), batches.append)
+    write_lines(tmp_path / 'a.jsonl', [valid, 'garbage'])
+    with open(tmp_path / 'a.jsonl', 'a') as f:
+        f.write(json.dumps({**valid, 'party': 'REP'}))  # Still being written
+
+    assert feed.poll() == 1
+    assert batches == [[valid]]
+    with open(tmp_path / 'a.jsonl', 'a') as f:
+        f.write('\n')
+    assert feed.poll() == 1
+    assert batches[-1] == [{**valid, 'party': 'REP'}]
+    assert feed.poll() == 0
+    assert feed.stats() == {'path': str(tmp_path), 'applied': 2, 'rejected': 1, 'failed_batches': 0, 'files': 1}
+
+
+def test_failed_batch_is_counted_and_skipped(tmp_path):
+    def on_records(records):
+        if records[0]['party'] == 'DEM':
+            raise KeyError('DEM')
+
+    feed = LiveResultsFeed(str(tmp_path / 'feed.jsonl'), on_records)
+    write_lines(tmp_path / 'feed.jsonl', [valid, valid])
+    assert feed.poll() == 0
+    write_lines(tmp_path / 'feed.jsonl', [{**valid, 'party': 'REP'}])
+    assert feed.poll() == 1
+    stats = feed.stats()
+    assert (stats['applied'], stats['rejected'], stats['failed_batches']) == (1, 2, 1)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from electionData import build_margin_engine
+from swingModel import flip_swings, historical_swing, project, tipping_point_swing
+
+electoral_votes = {'AA': 200, 'BB': 70, 'CC': 100, 'DD': 168}
+
+
+def engine_of(shares):
+    # shares: {(year, state_po): (DEM share, REP share)}, None for a party without votes;
+    # OTHER gets the rest
+    rows = [
+        {'year': year, 'state': state_po, 'state_po': state_po, 'party': party, 'pct': pct}
+        for (year, state_po), (dem, rep) in shares.items()
+        for party, pct in (('DEM', dem), ('REP', rep), ('OTHER', 1 - (dem or 0) - (rep or 0))) if pct is not None
+    ]
+    return build_margin_engine(pd.DataFrame(rows))
+
+
+base = {
+    (2020, 'AA'): (0.40, 0.60), (2020, 'BB'): (0.48, 0.52),
+    (2020, 'CC'): (0.55, 0.45), (2020, 'DD'): (0.30, 0.70),
+}
+
+
+def test_uniform_flip_swing_is_the_margin():
+    states, flips, votes = flip_swings(engine_of(base), electoral_votes, 2020)
+    assert states == ['AA', 'BB', 'CC', 'DD']
+    assert flips == pytest.approx([20, 4, -10, 40])
+    assert votes.tolist() == [200, 70, 100, 168]
+
+
+@pytest.mark.parametrize('mode', ['uniform', 'proportional'])
+def test_states_flip_at_their_flip_swing(mode):
+    engine = engine_of(base)
+    states, flips, _ = flip_swings(engine, electoral_votes, 2020, mode)
+    before = project(engine, electoral_votes, 2020, flips - 0.01, mode)['dem_won']
+    after = project(engine, electoral_votes, 2020, flips + 0.01, mode)['dem_won']
+    # Row i is the grid point around state i's flip swing
+    assert not np.diagonal(before).any()
+    assert np.diagonal(after).all()
+
+
+def test_tipping_point_swing():
+    # CC, then BB, then AA takes DEM past 270
+    assert tipping_point_swing(engine_of(base), electoral_votes, 2020) == {'state': 'AA', 'swing': pytest.approx(20.0)}
+
+
+def test_tipping_point_skips_states_that_never_flip():
+    # Only OTHER has votes in BB: no proportional swing moves it
+    engine = engine_of({**base, (2020, 'BB'): (None, None)})
+    states, flips, _ = flip_swings(engine, electoral_votes, 2020, 'proportional')
+    assert np.isnan(flips[states.index('BB')])
+    assert tipping_point_swing(engine, electoral_votes, 2020, 'proportional')['state'] == 'AA'
+
+
+def test_tipping_point_is_none_when_270_is_out_of_reach():
+    # 2024 is only reported in AA and BB, 270 electoral votes
+    shares = {**base, (2024, 'AA'): (0.41, 0.59), (2024, 'BB'): (0.47, 0.53)}
+    assert tipping_point_swing(engine_of(shares), electoral_votes, 2024) == {'state': 'AA', 'swing': pytest.approx(18.0)}
+    del shares[(2024, 'BB')]
+    assert tipping_point_swing(engine_of(shares), electoral_votes, 2024) is None
+
+
+def test_historical_swing_over_states_reported_in_both_years():
+    shares = {**base, (2024, 'AA'): (0.45, 0.55), (2024, 'BB'): (0.46, 0.54)}
+    # AA moves 10 points towards DEM and BB 4 towards REP, weighted 200 and 70
+    assert historical_swing(engine_of(shares), electoral_votes, 2020, 2024) == pytest.approx((200 * 10 - 70 * 4) / 270)
+    assert historical_swing(engine_of(base), {'ZZ': 10}, 2020, 2020) == 0.0
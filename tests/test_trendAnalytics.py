@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from electionData import build_margin_engine
+from trendAnalytics import build_trends, electoral_winners, national_margins, rolling_mean, trends_json
+
+years = [2000, 2004, 2008, 2012, 2016, 2020]
+
+
+def engine_of(margins):
+    # margins: {state_po: REP minus DEM margin in points per year, None when not reported}
+    rows = []
+    for state_po, values in margins.items():
+        for year, margin in zip(years, values):
+            if margin is not None:
+                rows.append({'year': year, 'state': state_po, 'state_po': state_po, 'party': 'DEM', 'pct': 0.5 - margin / 200})
+                rows.append({'year': year, 'state': state_po, 'state_po': state_po, 'party': 'REP', 'pct': 0.5 + margin / 200})
+    return build_margin_engine(pd.DataFrame(rows))
+
+
+def test_national_margin_is_turnout_weighted():
+    margins = np.array([[10.0, 10.0, np.nan], [-20.0, -20.0, 5.0]])
+    turnout = np.array([[300.0, np.nan, np.nan], [100.0, np.nan, 50.0]])
+    # Without any turnout in a year, the reported locations weigh the same
+    assert national_margins(margins, turnout) == pytest.approx([2.5, -5.0, 5.0])
+
+
+def test_rolling_mean_skips_missing_elections():
+    means, counts = rolling_mean(np.array([[1.0, np.nan, 3.0, 5.0, np.nan, np.nan, np.nan]]), 3)
+    assert counts.tolist() == [[1, 1, 2, 2, 2, 1, 0]]
+    np.testing.assert_allclose(means, [[1, 1, 2, 4, 4, 5, np.nan]])
+
+
+def test_realignment_lean_and_swing():
+    engine = engine_of({
+        'XX': [-10, -10, -10, 10, 10, 10],
+        'YY': [10, 10, 10, -10, -10, -10],
+    })
+    trends = build_trends(engine, np.ones((2, len(years))), np.zeros(len(years)))
+
+    np.testing.assert_allclose(trends['national_margin'], 0, atol=1e-9)
+    np.testing.assert_allclose(trends['lean'][0], [-10, -10, -10, 10, 10, 10])
+    np.testing.assert_allclose(trends['swing'][0], [np.nan, 0, 0, 20, 0, 0], atol=1e-9)
+    assert trends['realignment_year'].tolist() == [2012, 2012]
+    assert trends['realignment_shift'] == pytest.approx([20, -20])
+    # No national winner: no election decides a bellwether
+    assert np.isnan(trends['bellwether']).all()
+
+
+def test_unreported_elections_are_skipped():
+    engine = engine_of({'XX': [5, None, 5, 5, 5, 5], 'YY': [-5, -5, -5, -5, -5, -5]})
+    winners = np.array([1, -1, 1, 1, -1, 1])
+    trends = build_trends(engine, np.full((2, len(years)), np.nan), winners)
+
+    assert np.isnan(trends['margin'][0, 1])
+    assert np.isnan(trends['swing'][0, 1:3]).all()
+    # XX voted REP in the 5 elections it reported, 4 of them won by REP
+    assert trends['bellwether'] == pytest.approx([0.8, 2 / 6])
+    assert trends['volatility'][0] == pytest.approx(0.0)
+    assert trends['realignment_year'].tolist() == [0, 0]
+
+
+def test_electoral_winners_count_electoral_votes():
+    margins = np.array([[5.0, -5.0], [-5.0, -5.0], [np.nan, 5.0]])
+    assert electoral_winners(margins, ['AA', 'BB', 'CC'], {'AA': 20, 'BB': 10, 'CC': 40}).tolist() == [1, 1]
+
+
+def test_trends_json_rounds_and_filters():
+    engine = engine_of({'XX': [5, None, 5, 5, 5, 5], 'YY': [-5, -5, -5, -5, -5, -5]})
+    trends = build_trends(engine, np.full((2, len(years)), np.nan), np.array([1, -1, 1, 1, -1, 1]))
+    payload = trends_json(trends, ['XX'])
+
+    assert list(payload['locations']) == ['XX']
+    assert payload['national']['winner'] == ['REP', 'DEM', 'REP', 'REP', 'DEM', 'REP']
+    xx = payload['locations']['XX']
+    assert xx['margin'][:2] == [5.0, None]
+    assert xx['realignment'] is None
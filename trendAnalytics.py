@@ -0,0 +1,152 @@
+import numpy as np
+
+# Trends over every election of the margin engine panel (states, or counties with countyData).
+# Margins are REP minus DEM in points; every measure is a NumPy operation over the whole
+# location x year matrix, so county panels take milliseconds as well.
+#   lean           margin minus the national margin of the year
+#   swing          margin change since the previous election, rolling_swing its rolling mean
+#   volatility     standard deviation of the swings
+#   bellwether     share of the elections where the location voted for the national winner
+#   realignment    election where the average lean of the elections before and after it has
+#                  opposite signs and moved by at least realignment_threshold points
+
+trend_window = 3  # Elections in the rolling swing and on each side of a realignment
+realignment_threshold = 5.0
+
+
+def reported_margins(engine):
+    # Margins in points, NaN where a location has no DEM or REP result
+    dem = engine['pct'][:, :, engine['party_index']['DEM']]
+    rep = engine['pct'][:, :, engine['party_index']['REP']]
+    return 100 * (rep - dem)
+
+
+def location_turnout(df, engine, location='state_po'):
+    # Total votes of every location and year, aligned with the engine, NaN when not reported
+    totals = df.groupby([location, 'year'], observed=True)['totalvotes'].max().unstack('year')
+    return totals.reindex(index=engine['states'], columns=list(engine['year_index'])).to_numpy(dtype=float)
+
+
+def nan_mean(values, axis):
+    # np.nanmean without the warning on all-NaN slices
+    counts = (~np.isnan(values)).sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, np.nansum(values, axis=axis) / counts, np.nan)
+
+
+def rolling_mean(values, window):
+    # Mean of the last `window` elections of every location (NaN ignored) and the number of values
+    filled = np.cumsum(np.nan_to_num(values), axis=1)
+    counts = np.cumsum(~np.isnan(values), axis=1)
+    filled[:, window:] -= filled[:, :-window].copy()
+    counts[:, window:] -= counts[:, :-window].copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, filled / counts, np.nan), counts
+
+
+def national_margins(margins, turnout):
+    # Turnout weighted margin of every year; a year without turnout weighs its locations equally
+    reported = ~np.isnan(margins)
+    weights = np.where(reported, np.nan_to_num(turnout), 0.0)
+    unweighted = weights.sum(axis=0) == 0
+    weights[:, unweighted] = reported[:, unweighted]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (weights * np.nan_to_num(margins)).sum(axis=0) / weights.sum(axis=0)
+
+
+def electoral_winners(margins, locations, electoral_votes):
+    # +1 when REP carried a majority of the electoral votes of the reported states, -1 for DEM
+    votes = np.array([electoral_votes.get(state, 0) for state in locations], dtype=float)
+    rep_ev = ((margins > 0) * votes[:, None]).sum(axis=0)
+    dem_ev = ((margins < 0) * votes[:, None]).sum(axis=0)
+    return np.sign(rep_ev - dem_ev)
+
+
+def build_trends(engine, turnout, national_winner, window=trend_window, threshold=realignment_threshold):
+    margins = reported_margins(engine)
+    national = national_margins(margins, turnout)
+    lean = margins - national
+
+    swing = np.full_like(margins, np.nan)
+    swing[:, 1:] = np.diff(margins, axis=1)
+    rolling_swing, _ = rolling_mean(swing, window)
+    volatility = np.sqrt(nan_mean((swing - nan_mean(swing, axis=1)[:, None]) ** 2, axis=1))
+
+    # Ties (sign 0) and unreported elections do not count
+    decided = ~np.isnan(margins) & (national_winner != 0)
+    hits = (np.sign(margins) == national_winner) & decided
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bellwether = np.where(decided.sum(axis=1) > 0, hits.sum(axis=1) / decided.sum(axis=1), np.nan)
+
+    # Average lean of the `window` elections before each one, and of the `window` from it on
+    before, before_counts = rolling_mean(lean, window)
+    before = np.roll(before, 1, axis=1)
+    before_counts = np.roll(before_counts, 1, axis=1)
+    before_counts[:, 0] = 0
+    after, after_counts = (array[:, ::-1] for array in rolling_mean(lean[:, ::-1], window))
+    shift = after - before
+    realigned = (
+        (before_counts == window) & (after_counts == window)
+        & (np.sign(before) != np.sign(after)) & (np.abs(shift) >= threshold)
+    )
+    # The election with the largest shift when several qualify
+    strongest = np.argmax(np.where(realigned, np.abs(shift), -1.0), axis=1)
+    has_realignment = realigned.any(axis=1)
+
+    years = np.array(list(engine['year_index']))
+    rows = np.arange(len(margins))
+    return {
+        'locations': engine['states'],
+        'years': years,
+        'window': window,
+        'national_margin': national,
+        'national_winner': national_winner,
+        'margin': margins,
+        'lean': lean,
+        'swing': swing,
+        'rolling_swing': rolling_swing,
+        'volatility': volatility,
+        'bellwether': bellwether,
+        'realignment_year': np.where(has_realignment, years[strongest], 0),
+        'realignment_shift': np.where(has_realignment, shift[rows, strongest], np.nan),
+    }
+
+
+def round_values(values, digits=2):
+    # JSON friendly lists, NaN as None
+    values = np.round(np.asarray(values, dtype=float), digits)
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def trends_json(trends, locations=None):
+    # Payload of /api/trends, optionally restricted to some locations
+    rows = np.arange(len(trends['locations']))
+    if locations is not None:
+        rows = rows[trends['locations'].isin(locations)]
+
+    def winner(sign):
+        return 'REP' if sign > 0 else ('DEM' if sign < 0 else None)
+
+    return {
+        'years': trends['years'].tolist(),
+        'window': trends['window'],
+        'national': {
+            'margin': round_values(trends['national_margin']),
+            'winner': [winner(sign) for sign in trends['national_winner']],
+        },
+        'locations': {
+            str(trends['locations'][row]): {
+                'margin': round_values(trends['margin'][row]),
+                'lean': round_values(trends['lean'][row]),
+                'swing': round_values(trends['swing'][row]),
+                'rolling_swing': round_values(trends['rolling_swing'][row]),
+                'volatility': round_values(trends['volatility'][row]),
+                'bellwether': round_values(trends['bellwether'][row], 4),
+                'realignment': {
+                    'year': int(trends['realignment_year'][row]),
+                    'shift': round_values(trends['realignment_shift'][row]),
+                } if trends['realignment_year'][row] else None,
+            }
+            for row in rows
+        },
+    }